@@ -0,0 +1,76 @@
+# Проверка разбора архива тиражей на сохраненной странице (без сети и БД)
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from lottery_parser import extract_draws, parse_archive_html
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Сохраненная страница архива: ячейки и строки частично без закрывающих тегов, шары через <br>
+FIXTURE_FILE = os.path.join(SCRIPT_DIR, "fixtures", "archive_4x20.html")
+
+
+def draw(number, draw_datetime, balls):
+    """Ожидаемый словарь тиража в формате extract_draws"""
+    result = {'номер_тиража': number, 'дата_время_тиража': draw_datetime}
+    result.update({f'шар{i}': ball for i, ball in enumerate(balls, 1)})
+    return result
+
+
+# Тиражи на странице FIXTURE_FILE (таблица в подвале страницы разбираться не должна)
+EXPECTED_DRAWS = {
+    1002: draw(1002, datetime(2024, 1, 3, 12, 0), [7, 11, 2, 19, 4, 20, 13, 8]),
+    1001: draw(1001, datetime(2024, 1, 3, 11, 45), [1, 2, 3, 4, 5, 6, 7, 8]),
+    1000: draw(1000, datetime(2024, 1, 3, 11, 30), [20, 19, 18, 17, 16, 15, 14, 13]),
+    999: draw(999, datetime(2024, 1, 3, 11, 0), [5, 10, 15, 20, 1, 6, 11, 16]),
+}
+
+
+def compare(title, parsed, expected):
+    """Печатает расхождения разобранных тиражей с ожидаемыми. Возвращает True, если их нет"""
+    success = True
+    for number in sorted(expected.keys() | parsed.keys(), reverse=True):
+        if number not in parsed:
+            print(f"✗ {title}: тираж {number} не найден")
+            success = False
+        elif number not in expected:
+            print(f"✗ {title}: лишний тираж {number}")
+            success = False
+        elif parsed[number] != expected[number]:
+            print(f"✗ {title}: тираж {number} разобран как {parsed[number]}, ожидалось {expected[number]}")
+            success = False
+    if success:
+        print(f"✓ {title}: {len(parsed)} тиражей совпадают с ожидаемыми")
+    return success
+
+
+def main():
+    """Основная функция. Код возврата 1 - разбор страницы расходится с ожидаемыми тиражами"""
+    arg_parser = argparse.ArgumentParser(description="Проверка разбора архива тиражей на сохраненной странице")
+    arg_parser.add_argument('--html', default=FIXTURE_FILE, help="сохраненная страница архива")
+    args = arg_parser.parse_args()
+
+    with open(args.html, encoding='utf-8') as f:
+        rows = parse_archive_html(f.read())
+
+    parsed, skipped, reached_known = extract_draws(rows)
+    success = compare("Весь архив", parsed, EXPECTED_DRAWS)
+    if skipped or reached_known:
+        print(f"✗ Весь архив: пропущено строк {skipped}, остановка на известном тираже {reached_known}")
+        success = False
+
+    # Дозагрузка: разбор останавливается на первом тираже, который уже есть в БД
+    stop_at = 1000
+    parsed, _, reached_known = extract_draws(rows, stop_at=stop_at)
+    expected = {number: value for number, value in EXPECTED_DRAWS.items() if number > stop_at}
+    success = compare(f"Новее тиража {stop_at}", parsed, expected) and success
+    if not reached_known:
+        print(f"✗ Новее тиража {stop_at}: разбор не остановился на известном тираже")
+        success = False
+
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,177 +1,278 @@
 # Отправка данных из PostgreSQL в Telegram бот
 #
-import psycopg2
-import requests
 import json
+import csv
+import gzip
+import io
+import tempfile
 import logging
 from datetime import datetime
 import os
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
 from dotenv import load_dotenv
+from db import DB_CONFIG, get_connection
+from telegram_sender import TelegramSender
 
 # Загрузка переменных из .env файла
 load_dotenv()
 
+# Сколько строк серверный курсор забирает из БД за один раз
+DB_ITERSIZE = int(os.getenv('DB_ITERSIZE', 2000))
+# Данные больше этого размера (символов) отправляются файлом, а не сообщением
+MESSAGE_DATA_LIMIT = 3000
+# Лимит Telegram на длину сообщения и длина части (с запасом под заголовок "Часть i/n")
+TELEGRAM_MESSAGE_LIMIT = 4096
+MESSAGE_PART_LENGTH = 4000
+# Формат файла выгрузки: ndjson (JSON запись на строку) или csv, файл сжимается gzip
+EXPORT_FORMAT = os.getenv('EXPORT_FORMAT', 'ndjson')
+# Выгрузка собирается в памяти; больше этого размера (байт) буфер переносится во временный файл ОС
+EXPORT_SPOOL_MAX_SIZE = int(os.getenv('EXPORT_SPOOL_MAX_SIZE', 8 * 1024 * 1024))
+# Сколько получателей обслуживается одновременно
+FANOUT_WORKERS = int(os.getenv('TELEGRAM_FANOUT_WORKERS', 8))
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def parse_chat_ids(chat_ids):
+    # Список ID чатов из строки через запятую, одного ID или списка
+    if chat_ids is None:
+        return []
+    if isinstance(chat_ids, (list, tuple, set)):
+        return [str(chat_id).strip() for chat_id in chat_ids if str(chat_id).strip()]
+    return [chat_id.strip() for chat_id in str(chat_ids).split(',') if chat_id.strip()]
+
 class BotDataSender:
-    def __init__(self, db_config=None, bot_token=None, chat_id=None):
+    def __init__(self, db_config=None, bot_token=None, chat_id=None, max_workers=FANOUT_WORKERS):
         # Получение настроек из .env если не переданы явно
-        self.db_config = db_config or {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'database': os.getenv('DB_NAME'),
-            'user': os.getenv('DB_USER'),
-            'password': os.getenv('DB_PASSWORD'),
-            'port': int(os.getenv('DB_PORT', 5432))
-        }
+        # chat_id - один ID, список или строка через запятую (TELEGRAM_CHAT_ID в .env - так же)
+        self.db_config = db_config or DB_CONFIG
         
         self.bot_token = bot_token or os.getenv('TELEGRAM_BOT_TOKEN')
-        self.chat_id = chat_id or os.getenv('TELEGRAM_CHAT_ID')
+        self.chat_ids = parse_chat_ids(chat_id or os.getenv('TELEGRAM_CHAT_ID'))
+        self.max_workers = max_workers
+        # Результат последней отправки по каждому чату: chat_id -> True/False
+        self.last_results = {}
         
         if not self.bot_token:
             raise ValueError("Токен бота не указан. Укажите в .env файле как TELEGRAM_BOT_TOKEN")
-        if not self.chat_id:
+        if not self.chat_ids:
             raise ValueError("ID чата не указан. Укажите в .env файле как TELEGRAM_CHAT_ID")
         
-        self.telegram_url = f"https://api.telegram.org/bot{self.bot_token}/"
-        logger.info("BotDataSender инициализирован")
+        # Отправка через общую сессию с учетом лимитов Telegram
+        self.sender = TelegramSender(self.bot_token)
+        logger.info(f"BotDataSender инициализирован, получателей: {len(self.chat_ids)}")
 
-    def get_data_from_postgres(self, query):
-        # Получение данных из PostgreSQL
+    def send_to_all(self, send):
+        # Вызывает send(chat_id) для всех получателей параллельно (не больше max_workers одновременно).
+        # Возвращает результат по каждому чату: chat_id -> True/False
+        workers = max(1, min(self.max_workers, len(self.chat_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {chat_id: executor.submit(send, chat_id) for chat_id in self.chat_ids}
+        
+        results = {}
+        for chat_id, future in futures.items():
+            try:
+                results[chat_id] = bool(future.result())
+            except Exception as e:
+                logger.error(f"Ошибка отправки в чат {chat_id}: {e}")
+                results[chat_id] = False
+        
+        failed = [chat_id for chat_id, ok in results.items() if not ok]
+        if failed:
+            logger.error(f"Не доставлено в чаты: {', '.join(failed)} (успешно {len(results) - len(failed)} из {len(results)})")
+        else:
+            logger.info(f"Доставлено во все чаты ({len(results)})")
+        self.last_results = results
+        return results
+
+    def iter_data_from_postgres(self, query, itersize=DB_ITERSIZE):
+        # Построчное получение данных из PostgreSQL через серверный (именованный) курсор:
+        # строки приходят пачками по itersize, в памяти не больше одной пачки.
+        # Запрос должен быть SELECT; соединение занято, пока генератор не дочитан или не закрыт
+        count = 0
         try:
-            conn = psycopg2.connect(**self.db_config)
-            cursor = conn.cursor()
-            
-            cursor.execute(query)
-            columns = [desc[0] for desc in cursor.description]
-            data = cursor.fetchall()
-            
-            # Преобразование в список словарей
-            result = []
-            for row in data:
-                result.append(dict(zip(columns, row)))
-            
-            cursor.close()
-            conn.close()
-            
-            logger.info(f"Получено {len(result)} записей из базы данных")
-            return result
-            
+            with get_connection(self.db_config) as conn:
+                with conn.cursor(name='bot_data_export') as cursor:
+                    cursor.itersize = itersize
+                    cursor.execute(query)
+                    
+                    columns = None
+                    for row in cursor:
+                        # У серверного курсора описание колонок появляется после первой выборки
+                        if columns is None:
+                            columns = [desc[0] for desc in cursor.description]
+                        count += 1
+                        yield dict(zip(columns, row))
         except Exception as e:
             logger.error(f"Ошибка при получении данных из PostgreSQL: {e}")
+            raise
+        
+        logger.info(f"Получено {count} записей из базы данных")
+
+    def get_data_from_postgres(self, query):
+        # Получение данных из PostgreSQL списком словарей
+        try:
+            return list(self.iter_data_from_postgres(query))
+        except Exception:
             return []
 
-    def format_data_for_telegram(self, data, max_records=10):
-        if not data:
-            return "Нет данных для отображения"
+    def render_records(self, data, max_records=10, total=None):
+        # Генератор фрагментов сообщения: заголовок, по фрагменту на запись и итог.
+        # data - список или итератор записей (total - общее число записей для итератора)
+        if total is None:
+            total = len(data)
         
-        # Ограничиваем количество записей для сообщения
-        display_data = data[:max_records]
-        
-        formatted_text = f"Найдено записей: {len(data)}\n"
-        formatted_text += f"Время выгрузки: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        yield (f"Найдено записей: {total}\n"
+               f"Время выгрузки: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
         
-        for i, record in enumerate(display_data, 1):
-            formatted_text += f"Запись #{i}:\n"
+        # Ограничиваем количество записей для сообщения
+        for i, record in enumerate(islice(data, max_records), 1):
+            lines = [f"Запись #{i}:\n"]
             for key, value in record.items():
                 # Обрезаем длинные значения
                 if value and len(str(value)) > 50:
                     value = str(value)[:47] + "..."
-                formatted_text += f"   • {key}: {value}\n"
-            formatted_text += "\n"
+                lines.append(f"   • {key}: {value}\n")
+            lines.append("\n")
+            yield "".join(lines)
         
         # Если записей больше чем показываем, добавляем информацию
-        if len(data) > max_records:
-            formatted_text += f"... и еще {len(data) - max_records} записей\n"
+        if total > max_records:
+            yield f"... и еще {total - max_records} записей\n"
+
+    def format_data_for_telegram(self, data, max_records=10):
+        if not data:
+            return "Нет данных для отображения"
         
-        return formatted_text
+        return "".join(self.render_records(data, max_records))
+
+    def iter_message_chunks(self, pieces, max_length=MESSAGE_PART_LENGTH):
+        # Собирает фрагменты текста в части не длиннее max_length по мере поступления.
+        # Фрагмент не разрывается, если помещается в часть целиком; длинный фрагмент делится split_long_message
+        buffer = []
+        length = 0
+        for piece in pieces:
+            if buffer and length + len(piece) > max_length:
+                yield "".join(buffer)
+                buffer = []
+                length = 0
+            if len(piece) > max_length:
+                parts = self.split_long_message(piece, max_length)
+                yield from parts[:-1]
+                piece = parts[-1]
+            buffer.append(piece)
+            length += len(piece)
+        if buffer:
+            yield "".join(buffer)
 
-    def split_long_message(self, text, max_length=4000):
-        #Разделяет длинное сообщение на части
+    def split_long_message(self, text, max_length=MESSAGE_PART_LENGTH):
+        #Разделяет длинное сообщение на части (за один проход, без копирования остатка текста)
         if len(text) <= max_length:
             return [text]
         
         parts = []
-        while text:
-            if len(text) <= max_length:
-                parts.append(text)
+        start = 0
+        while start < len(text):
+            end = start + max_length
+            if end >= len(text):
+                parts.append(text[start:])
                 break
-            else:
-                # Ищем точку разрыва
-                split_pos = text.rfind('\n\n', 0, max_length)
-                if split_pos == -1:
-                    split_pos = text.rfind('\n', 0, max_length)
-                if split_pos == -1:
-                    split_pos = max_length
-                    
-                parts.append(text[:split_pos])
-                text = text[split_pos:].lstrip()
+            
+            # Ищем точку разрыва
+            split_pos = text.rfind('\n\n', start + 1, end)
+            if split_pos == -1:
+                split_pos = text.rfind('\n', start + 1, end)
+            if split_pos == -1:
+                split_pos = end
+            
+            parts.append(text[start:split_pos])
+            # Пропускаем пробелы и переводы строк в начале следующей части
+            start = split_pos
+            while start < len(text) and text[start].isspace():
+                start += 1
         
         return parts
 
     def send_to_telegram(self, message):
+        # Разделяем сообщение если оно слишком длинное
+        return self.send_message_parts(self.split_long_message(message))
+
+    def send_message_parts(self, message_parts):
+        # Отправка готовых частей сообщения по порядку (с паузами по лимитам Telegram и повтором после 429)
         try:
-            # Разделяем сообщение если оно слишком длинное
-            message_parts = self.split_long_message(message)
+            if len(message_parts) > 1:
+                message_parts = [f"Часть {i+1}/{len(message_parts)}\n\n{part}"
+                                 for i, part in enumerate(message_parts)]
             
-            success = True
-            for i, part in enumerate(message_parts):
-                if len(message_parts) > 1:
-                    part = f"Часть {i+1}/{len(message_parts)}\n\n{part}"
-                
-                url = self.telegram_url + "sendMessage"
-                payload = {
-                    'chat_id': self.chat_id,
-                    'text': part,
-                    'parse_mode': 'Markdown'
-                }
-                
-                response = requests.post(url, json=payload)
-                
-                if response.status_code == 200:
-                    logger.info(f"Часть {i+1} успешно отправлена")
-                else:
-                    logger.error(f"Ошибка отправки части {i+1}: {response.text}")
-                    success = False
+            def send(chat_id):
+                sent = self.sender.send_messages(chat_id, message_parts, parse_mode='Markdown')
+                logger.info(f"Чат {chat_id}: отправлено частей {sent} из {len(message_parts)}")
+                return sent == len(message_parts)
             
-            return success
+            return all(self.send_to_all(send).values())
                 
         except Exception as e:
             logger.error(f"Ошибка при отправке в Telegram: {e}")
             return False
 
-    def send_data_as_file(self, data, filename="data.json", message="Данные из базы данных"):
+    def write_export(self, data, buffer, export_format=EXPORT_FORMAT):
+        # Построчная запись данных в буфер, сжатый gzip: ndjson или csv.
+        # data может быть генератором - в памяти держится только текущая запись
+        count = 0
+        with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as gz:
+            with io.TextIOWrapper(gz, encoding='utf-8', newline='') as out:
+                if export_format == 'csv':
+                    writer = None
+                    for record in data:
+                        if writer is None:
+                            writer = csv.DictWriter(out, fieldnames=list(record.keys()))
+                            writer.writeheader()
+                        writer.writerow(record)
+                        count += 1
+                else:
+                    for record in data:
+                        out.write(json.dumps(record, ensure_ascii=False, default=str))
+                        out.write('\n')
+                        count += 1
+        return count
+
+    def send_data_as_file(self, data, filename="data.json", message="Данные из базы данных",
+                          export_format=EXPORT_FORMAT):
 
-        #Отправка данных как файла (для больших объемов)
+        #Отправка данных как файла (для больших объемов): сжатый ndjson/csv из буфера в памяти
         try:
             # Сначала отправляем поясняющее сообщение
-            text_url = self.telegram_url + "sendMessage"
-            text_payload = {
-                'chat_id': self.chat_id,
-                'text': f"{message}\n📎 Данные отправлены как файл"
-            }
-            requests.post(text_url, json=text_payload)
+            self.send_to_all(lambda chat_id: self.sender.send_message(chat_id, f"{message}\n📎 Данные отправлены как файл"))
             
-            # Создаем временный файл
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            export_format = 'csv' if export_format == 'csv' else 'ndjson'
+            filename = f"{os.path.splitext(filename)[0]}.{export_format}.gz"
             
-            # Отправка файла
-            file_url = self.telegram_url + "sendDocument"
-            with open(filename, 'rb') as file:
-                files = {'document': (filename, file)}
-                data_payload = {'chat_id': self.chat_id}
-                response = requests.post(file_url, data=data_payload, files=files)
-            
-            # Удаляем временный файл
-            os.remove(filename)
+            # Буфер в памяти (большая выгрузка уходит во временный файл ОС, а не в рабочую папку)
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE) as buffer:
+                count = self.write_export(data, buffer, export_format)
+                size = buffer.tell()
+                buffer.seek(0)
+                logger.info(f"Выгрузка {filename}: {count} записей, {size} байт")
+                
+                # Отправка файла: выгрузка собирается один раз на всех получателей.
+                # Одному получателю уходит сам буфер, нескольким - копии сжатых данных в памяти
+                if len(self.chat_ids) == 1:
+                    open_payload = lambda: buffer
+                else:
+                    payload = buffer.read()
+                    open_payload = lambda: io.BytesIO(payload)
+                
+                results = self.send_to_all(
+                    lambda chat_id: self.sender.send_document(chat_id, filename, open_payload(), 'application/gzip'))
             
-            if response.status_code == 200:
+            if all(results.values()):
                 logger.info("Файл успешно отправлен в Telegram")
                 return True
             else:
-                logger.error(f"Ошибка отправки файла: {response.text}")
+                logger.error("Ошибка отправки файла")
                 return False
                 
         except Exception as e:
@@ -181,23 +282,31 @@ class BotDataSender:
     def migrate_data_to_bot(self, query, message="Миграция данных", send_as_file=False):
         # Отправка в ТГ
         try:
-            # Получение данных из PostgreSQL
-            data = self.get_data_from_postgres(query)
-            if not data:
-                logger.warning("Нет данных для отправки")
-                self.send_to_telegram(f"❌ {message}: нет данных для отправки")
-                return False
-            
-            logger.info(f"Обработано {len(data)} записей")
-            
-            if send_as_file or len(str(data)) > 3000:
-                # Отправка как файла для больших данных
-                return self.send_data_as_file(data, "database_export.json", message)
-            else:
-                # Отправка как читаемого сообщения
-                formatted_data = self.format_data_for_telegram(data)
-                full_message = f"✅ {message}\n\n{formatted_data}"
-                return self.send_to_telegram(full_message)
+            # Получение данных из PostgreSQL потоком строк
+            with closing(self.iter_data_from_postgres(query)) as rows:
+                # Читаем строки, пока размер данных не превысит лимит сообщения
+                preview = []
+                size = 0  # Оценка len(str(list)): записи, скобки и ", " между записями
+                for record in rows:
+                    preview.append(record)
+                    size += len(str(record)) + 2
+                    if send_as_file or size > MESSAGE_DATA_LIMIT:
+                        break
+                
+                if not preview:
+                    logger.warning("Нет данных для отправки")
+                    self.send_to_telegram(f"❌ {message}: нет данных для отправки")
+                    return False
+                
+                if send_as_file or size > MESSAGE_DATA_LIMIT:
+                    # Отправка как файла для больших данных: остаток строк дочитывается при записи
+                    return self.send_data_as_file(chain(preview, rows), "database_export.json", message)
+                
+                logger.info(f"Обработано {len(preview)} записей")
+                
+                # Отправка как читаемого сообщения: части собираются по мере форматирования записей
+                pieces = chain([f"✅ {message}\n\n"], self.render_records(preview))
+                return self.send_message_parts(list(self.iter_message_chunks(pieces)))
             
         except Exception as e:
             error_msg = f"❌ Ошибка при миграции данных: {str(e)}"
@@ -230,6 +339,10 @@ if __name__ == "__main__":
             print("✅ Данные успешно отправлены в Telegram!")
         else:
             print("❌ Произошла ошибка при отправке данных.")
+        
+        # Итог по каждому получателю
+        for chat_id, ok in bot_sender.last_results.items():
+            print(f"   {'✅' if ok else '❌'} чат {chat_id}")
             
     except ValueError as e:
         logger.error(f"Ошибка конфигурации: {e}")
@@ -0,0 +1,149 @@
+# Общий слой подключения к PostgreSQL: пул соединений на процесс.
+# psycopg2 импортируется при первом обращении к БД, чтобы импорт модуля был дешевым
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# Загружаем переменные из .env
+load_dotenv()
+
+# Конфигурация БД (берем только из .env; незаданные значения - None, тогда действуют умолчания libpq)
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST'),
+    'port': os.getenv('DB_PORT'),
+    'database': os.getenv('DB_NAME'),
+    'user': os.getenv('DB_USER'),
+    'password': os.getenv('DB_PASSWORD')
+}
+
+# Настройки пула
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 5))
+# Таймаут выполнения запроса на стороне сервера (мс), 0 - без ограничения
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 60000))
+# Через сколько секунд простоя соединение проверяется запросом SELECT 1
+DB_HEALTHCHECK_INTERVAL = float(os.getenv('DB_HEALTHCHECK_INTERVAL', 30))
+
+_pools = {}
+_last_used = {}
+_lock = threading.Lock()
+
+
+def _pool_key(db_config):
+    return tuple(sorted(db_config.items()))
+
+
+def get_pool(db_config=None):
+    """Возвращает пул соединений для конфигурации (создается один раз на процесс)"""
+    from psycopg2.pool import ThreadedConnectionPool
+
+    db_config = db_config or DB_CONFIG
+    key = _pool_key(db_config)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                options=f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
+                **db_config
+            )
+            _pools[key] = pool
+        return pool
+
+
+def is_connection_alive(conn):
+    """Проверка соединения: закрытое или не отвечающее соединение считается мертвым"""
+    import psycopg2
+
+    if conn.closed:
+        return False
+
+    last_used = _last_used.get(id(conn))
+    if last_used is not None and time.monotonic() - last_used < DB_HEALTHCHECK_INTERVAL:
+        return True
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def get_connection(db_config=None):
+    """Выдает соединение из пула и возвращает его обратно после работы.
+
+    Коммит остается за вызывающим кодом; при исключении и при незавершенной
+    транзакции выполняется откат, чтобы соединение вернулось в пул чистым.
+    """
+    import psycopg2
+    from psycopg2.extensions import STATUS_READY
+
+    pool = get_pool(db_config)
+    conn = pool.getconn()
+    if not is_connection_alive(conn):
+        pool.putconn(conn, close=True)
+        _last_used.pop(id(conn), None)
+        conn = pool.getconn()
+
+    broken = False
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        raise
+    finally:
+        if not conn.closed and not broken and conn.status != STATUS_READY:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        close = broken or bool(conn.closed)
+        if close:
+            _last_used.pop(id(conn), None)
+        else:
+            _last_used[id(conn)] = time.monotonic()
+        pool.putconn(conn, close=close)
+
+
+def close_all():
+    """Закрывает все пулы соединений (при завершении процесса)"""
+    with _lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+        _last_used.clear()
+
+
+@contextmanager
+def borrowed_connection(conn):
+    """Контекст с соединением вызывающего кода: соединение не закрывается и не возвращается в пул,
+    но при исключении транзакция откатывается, чтобы соединение можно было использовать дальше"""
+    import psycopg2
+
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+        raise
+
+
+def use_connection(conn=None, db_config=None):
+    """Контекст с переданным соединением (откат при исключении) или с соединением из пула"""
+    if conn is not None:
+        return borrowed_connection(conn)
+    return get_connection(db_config)
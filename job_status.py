@@ -0,0 +1,47 @@
+# Результат запуска задачи для планировщика: успех или неудача с типом ошибки
+TRANSIENT = 'transient'        # Временная ошибка (сеть, БД, сбой сайта) - имеет смысл повторить
+RATE_LIMITED = 'rate_limited'  # Превышен лимит запросов - повторять после долгой паузы
+PERMANENT = 'permanent'        # Повтор не поможет (нет API ключа, неверный ключ, нет файла)
+
+# Коды возврата скриптов для запуска отдельным процессом (2 - как у argparse при ошибке аргументов)
+EXIT_CODES = {TRANSIENT: 1, PERMANENT: 2, RATE_LIMITED: 3}
+
+
+class JobFailure:
+    """Неудачный результат точки входа с типом ошибки.
+
+    Объект ложный, поэтому код вида `if collect_weather():` работает как с False.
+    """
+
+    def __init__(self, kind=TRANSIENT, reason=''):
+        self.kind = kind
+        self.reason = reason
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"JobFailure({self.kind!r}, {self.reason!r})"
+
+
+def failure_kind(result):
+    """Тип ошибки результата точки входа или None при успехе (False - временная ошибка)"""
+    if isinstance(result, JobFailure):
+        return result.kind
+    return None if result else TRANSIENT
+
+
+def exit_code(result):
+    """Код возврата скрипта для результата точки входа"""
+    kind = failure_kind(result)
+    return 0 if kind is None else EXIT_CODES[kind]
+
+
+def failure_from_exit_code(code):
+    """Результат по коду возврата процесса: True при 0, иначе JobFailure (неизвестный код - временная ошибка)"""
+    if code in (0, None):
+        return True
+    for kind, kind_code in EXIT_CODES.items():
+        if code == kind_code:
+            return JobFailure(kind, f"код возврата {code}")
+    return JobFailure(TRANSIENT, f"код возврата {code}")
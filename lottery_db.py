@@ -1,70 +1,83 @@
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from db import DB_CONFIG, get_connection
 
 def lottery_db():
-    db_config = {
-        'host': os.getenv('DB_HOST', 'localhost'),
-        'port': int(os.getenv('DB_PORT', 5432)),
-        'database': os.getenv('DB_NAME', 'lottery_db'),
-        'user': os.getenv('DB_USER', 'lottery_user'),
-        'password': os.getenv('DB_PASSWORD', '123456')
-    }
+    db_config = DB_CONFIG
     
     print("Тестируем подключение к PostgreSQL...")
     print(f"Хост: {db_config['host']}")
     print(f"Порт: {db_config['port']}")
     print(f"База: {db_config['database']}")
     print(f"Пользователь: {db_config['user']}")
-    print(f"Пароль: {'*' * len(db_config['password'])}")
+    print(f"Пароль: {'*' * len(db_config['password'] or '')}")
     
     try:
-        connection = psycopg2.connect(**db_config)
-        print("Подключение к БД УСПЕШНО!")
+        with get_connection() as connection:
+            print("Подключение к БД УСПЕШНО!")
         
-        cursor = connection.cursor()
+            cursor = connection.cursor()
 
-        # Создаем таблицу для данных о погоде
-        # Связываем данные по дате/времени 
+            # Создаем таблицу для данных о погоде
+            # Связываем данные по дате/времени 
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS data_weather (
-                "id" SERIAL PRIMARY KEY,
-                "время_наблюдения" TIMESTAMP NOT NULL UNIQUE,
-                "давление" INTEGER,
-                "влажность" INTEGER,
-                "тип_осадков" VARCHAR(20),
-                "скорость_ветра" DECIMAL(5,2),
-                "температура" DECIMAL(4,1),
-                "направление_ветра" VARCHAR(20),
-                "создано" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-""")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS data_weather (
+                    "id" SERIAL PRIMARY KEY,
+                    "время_наблюдения" TIMESTAMP NOT NULL,
+                    "давление" INTEGER,
+                    "влажность" INTEGER,
+                    "тип_осадков" VARCHAR(20),
+                    "скорость_ветра" DECIMAL(5,2),
+                    "температура" DECIMAL(4,1),
+                    "направление_ветра" VARCHAR(20),
+                    "город" VARCHAR(100),
+                    "создано" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+            # Для таблиц, созданных до появления нескольких городов
+            cursor.execute('ALTER TABLE data_weather ADD COLUMN IF NOT EXISTS "город" VARCHAR(100)')
+            # Раньше собиралась только погода Москвы (название из ответа API с lang=ru).
+            # Строки без города заполняем, иначе их не найдет сопоставление с WEATHER_MATCH_CITY
+            # и не защитит от повторов уникальный индекс ниже (NULL не равен NULL)
+            cursor.execute("""
+                DELETE FROM data_weather old
+                WHERE old."город" IS NULL
+                  AND EXISTS (SELECT 1 FROM data_weather new
+                              WHERE new."город" = 'Москва' AND new."время_наблюдения" = old."время_наблюдения")
+            """)
+            cursor.execute("""UPDATE data_weather SET "город" = 'Москва' WHERE "город" IS NULL""")
+            # Наблюдение уникально в пределах города (время берется у провайдера, а не локальные часы)
+            cursor.execute('ALTER TABLE data_weather DROP CONSTRAINT IF EXISTS "data_weather_время_наблюдения_key"')
+            cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS "data_weather_город_время_key"
+                ON data_weather ("город", "время_наблюдения")
+            """)
+            # Поиск по времени без города (сопоставление в tab_to_re.py)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS "data_weather_время_idx"
+                ON data_weather ("время_наблюдения")
+            """)
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS lottery_4x20 (
-                "айди" SERIAL PRIMARY KEY,                                   -- Автоинкрементный первичный ключ
-                "номер_тиража" INTEGER UNIQUE NOT NULL,                   -- Уникальный номер тиража
-                "дата_время_тиража" TIMESTAMP NOT NULL,                   -- Дата и время тиража
-                "шар1" INTEGER NOT NULL,                                -- Первое число
-                "шар2" INTEGER NOT NULL,                                -- Второе число
-                "шар3" INTEGER NOT NULL,                                -- Третье число
-                "шар4" INTEGER NOT NULL,                                -- Четвертое число
-                "шар5" INTEGER NOT NULL,                                -- Пятое число
-                "шар6" INTEGER NOT NULL,                                -- Шестое число
-                "шар7" INTEGER NOT NULL,                                -- Седьмое число
-                "шар8" INTEGER NOT NULL,                                -- Восьмое число
-                "создано" TIMESTAMP DEFAULT CURRENT_TIMESTAMP            -- Время создания записи
-    )
-""")
-        connection.commit()
-        print("Таблицы созданы успешно!")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS lottery_4x20 (
+                    "айди" SERIAL PRIMARY KEY,                                   -- Автоинкрементный первичный ключ
+                    "номер_тиража" INTEGER UNIQUE NOT NULL,                   -- Уникальный номер тиража
+                    "дата_время_тиража" TIMESTAMP NOT NULL,                   -- Дата и время тиража
+                    "шар1" INTEGER NOT NULL,                                -- Первое число
+                    "шар2" INTEGER NOT NULL,                                -- Второе число
+                    "шар3" INTEGER NOT NULL,                                -- Третье число
+                    "шар4" INTEGER NOT NULL,                                -- Четвертое число
+                    "шар5" INTEGER NOT NULL,                                -- Пятое число
+                    "шар6" INTEGER NOT NULL,                                -- Шестое число
+                    "шар7" INTEGER NOT NULL,                                -- Седьмое число
+                    "шар8" INTEGER NOT NULL,                                -- Восьмое число
+                    "создано" TIMESTAMP DEFAULT CURRENT_TIMESTAMP            -- Время создания записи
+        )
+    """)
+            connection.commit()
+            print("Таблицы созданы успешно!")
         
-        cursor.close()
-        connection.close()
-        return True
+            cursor.close()
+            return True
         
     except Exception as e:
         print(f"Ошибка подключения: {e}")
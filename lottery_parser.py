@@ -1,103 +1,98 @@
 # Импорт необходимых библиотек
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-import psycopg2
+from html.parser import HTMLParser
 from datetime import datetime
+import argparse
+import json
 import re
 import os
 import sys
-from dotenv import load_dotenv
-
-# Установка UTF-8 кодировки для Windows
-if sys.platform == "win32":
-    sys.stdout.reconfigure(encoding='utf-8')
-    sys.stderr.reconfigure(encoding='utf-8')
-
-# Загружаем переменные из .env
-load_dotenv()
-
-# Конфигурация БД
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'port': os.getenv('DB_PORT'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD')
-}
-
-def test_db_connection():
+import threading
+from db import use_connection  # Импорт db также загружает переменные из .env
+from job_status import JobFailure, PERMANENT, RATE_LIMITED, exit_code
+
+# requests, psycopg2 и selenium импортируются при первом использовании,
+# чтобы запуск, прерванный на проверке БД, не тратил время на их загрузку
+
+ARCHIVE_URL = "https://www.lotonews.ru/draws/archive/4x20"
+# Адрес страниц архива (для догрузки при разрыве)
+ARCHIVE_PAGE_URL = os.getenv('ARCHIVE_PAGE_URL', ARCHIVE_URL + "?page={page}")
+# Сколько страниц архива максимум просматривать при разрыве
+GAP_MAX_PAGES = int(os.getenv('GAP_MAX_PAGES', 5))
+# Загрузка всей истории: число параллельных загрузок, размер пачки вставки, файл контрольной точки
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 4))
+BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', 500))
+BACKFILL_CHECKPOINT = os.getenv('BACKFILL_CHECKPOINT', 'backfill_checkpoint.json')
+# Способ загрузки архива: http (по умолчанию) или selenium
+LOTTERY_BACKEND = os.getenv('LOTTERY_BACKEND', 'http')
+HTTP_TIMEOUT = 30
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+_http_local = threading.local()
+
+# Снимок таблицы в браузере: для каждой строки массив текстов ячеек <td>
+TABLE_SNAPSHOT_SCRIPT = """
+return Array.from(arguments[0].rows).map(function (row) {
+    return Array.from(row.cells)
+        .filter(function (cell) { return cell.tagName === 'TD'; })
+        .map(function (cell) { return cell.innerText; });
+});
+"""
+
+def test_db_connection(conn=None):
     """Проверяем подключение к БД перед началом работы"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        conn.close()
+        with use_connection(conn) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
         print("[OK] Подключение к БД успешно")
         return True
     except Exception as e:
         print(f"[ERROR] Ошибка подключения к БД: {e}")
         return False
 
-def connect_db():
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        print(f"Ошибка подключения к БД: {e}")
-        return None
-
-def draw_exists(draw_number):
-    conn = connect_db()
-    if conn is None:
-        return True
-    
-    try:
-        with conn.cursor() as cursor:
-            check_query = 'SELECT 1 FROM lottery_4x20 WHERE "номер_тиража" = %s'
-            cursor.execute(check_query, (draw_number,))
-            return cursor.fetchone() is not None
-    except Exception as e:
-        print(f"Ошибка при проверке тиража: {e}")
-        return True
-    finally:
-        if conn:
-            conn.close()
+def add_draws_to_db(draws, verbose=True, conn=None):
+    """Добавляет тиражи одним запросом, уже существующие пропускаются.
 
-def add_draw_to_db(draw_data):
-    if draw_exists(draw_data['номер_тиража']):
-        return False
-    
-    conn = connect_db()
-    if conn is None:
-        return False
+    Возвращает список номеров добавленных тиражей или None при ошибке.
+    """
+    if not draws:
+        return []
     
     try:
-        with conn.cursor() as cursor:
-            insert_query = '''
-            INSERT INTO lottery_4x20 
-            ("номер_тиража", "дата_время_тиража", "шар1", "шар2", "шар3", "шар4", "шар5", "шар6", "шар7", "шар8")
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            '''
-            cursor.execute(insert_query, (
-                draw_data['номер_тиража'],
-                draw_data['дата_время_тиража'],
-                draw_data['шар1'],
-                draw_data['шар2'],
-                draw_data['шар3'],
-                draw_data['шар4'],
-                draw_data['шар5'],
-                draw_data['шар6'],
-                draw_data['шар7'],
-                draw_data['шар8']
-            ))
+        from psycopg2.extras import execute_values
+        
+        with use_connection(conn) as conn:
+            with conn.cursor() as cursor:
+                insert_query = '''
+                INSERT INTO lottery_4x20 
+                ("номер_тиража", "дата_время_тиража", "шар1", "шар2", "шар3", "шар4", "шар5", "шар6", "шар7", "шар8")
+                VALUES %s
+                ON CONFLICT ("номер_тиража") DO NOTHING
+                RETURNING "номер_тиража"
+                '''
+                rows = [(
+                    draw_data['номер_тиража'],
+                    draw_data['дата_время_тиража'],
+                    draw_data['шар1'],
+                    draw_data['шар2'],
+                    draw_data['шар3'],
+                    draw_data['шар4'],
+                    draw_data['шар5'],
+                    draw_data['шар6'],
+                    draw_data['шар7'],
+                    draw_data['шар8']
+                ) for draw_data in draws]
+                added = execute_values(cursor, insert_query, rows, page_size=len(rows), fetch=True)
             conn.commit()
-            print(f"[OK] Добавлен тираж {draw_data['номер_тиража']}")
-            return True
+        
+        added_numbers = sorted(row[0] for row in added)
+        if verbose:
+            for draw_number in added_numbers:
+                print(f"[OK] Добавлен тираж {draw_number}")
+        return added_numbers
     except Exception as e:
-        print(f"[ERROR] Ошибка при добавлении тиража: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn:
-            conn.close()
+        print(f"[ERROR] Ошибка при добавлении тиражей: {e}")
+        return None
 
 def parse_datetime(date_str):
     try:
@@ -126,12 +121,110 @@ def parse_draw_number(draw_str):
         print(f"Ошибка парсинга номера тиража: {e}")
         return 0
 
-def parser():
-    print("Парсер лотереи 4x20")
-    
-    if not test_db_connection():
-        print("Работа парсера прервана из-за ошибки подключения к БД")
-        return
+class ArchiveTableParser(HTMLParser):
+    """Собирает строки первой таблицы страницы: для каждой <tr> список текстов ячеек <td>.
+
+    Текстовые фрагменты ячейки склеиваются через перевод строки,
+    как это делает .text у элементов Selenium. Необязательные в HTML
+    </td> и </tr> не требуются: ячейка закрывается следующей <td>/<th>/<tr>,
+    строка - следующей <tr>, секцией таблицы или концом таблицы, как в браузере.
+    """
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.table_depth = 0
+        self.table_done = False
+        self.current_row = None
+        self.current_cell = None
+
+    def finish_cell(self):
+        if self.current_cell is not None:
+            text = '\n'.join(chunk.strip() for chunk in self.current_cell if chunk.strip())
+            self.current_row.append(text)
+            self.current_cell = None
+
+    def finish_row(self):
+        self.finish_cell()
+        self.current_row = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.table_done:
+            return
+        if tag == 'table':
+            self.table_depth += 1
+        elif self.table_depth != 1:
+            return
+        elif tag == 'tr':
+            self.finish_row()
+            self.current_row = []
+            self.rows.append(self.current_row)
+        elif tag in ('td', 'th'):
+            self.finish_cell()
+            # Заголовочные ячейки <th> не собираются (как в снимке таблицы через Selenium)
+            if tag == 'td' and self.current_row is not None:
+                self.current_cell = []
+        elif tag in ('thead', 'tbody', 'tfoot'):
+            self.finish_row()
+        elif tag == 'br' and self.current_cell is not None:
+            self.current_cell.append('\n')
+
+    def handle_endtag(self, tag):
+        if self.table_done:
+            return
+        if tag == 'table' and self.table_depth:
+            if self.table_depth == 1:
+                self.finish_row()
+                self.table_done = True
+            self.table_depth -= 1
+        elif self.table_depth != 1:
+            return
+        elif tag in ('td', 'th'):
+            self.finish_cell()
+        elif tag in ('tr', 'thead', 'tbody', 'tfoot'):
+            self.finish_row()
+
+    def handle_data(self, data):
+        if self.current_cell is not None:
+            self.current_cell.append(data)
+
+    def close(self):
+        super().close()
+        # Страница оборвалась внутри таблицы - сохраняем начатую строку
+        if not self.table_done and self.current_row is not None:
+            self.finish_row()
+
+def get_http_session():
+    """HTTP сессия с keep-alive, одна на поток (requests.Session не потокобезопасна)"""
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        import requests
+        session = requests.Session()
+        session.headers.update({'User-Agent': HTTP_USER_AGENT})
+        _http_local.session = session
+    return session
+
+def parse_archive_html(html):
+    """Возвращает строки таблицы архива (списки текстов ячеек) из HTML"""
+    table_parser = ArchiveTableParser()
+    table_parser.feed(html)
+    table_parser.close()
+    return table_parser.rows
+
+def fetch_rows_http(url=ARCHIVE_URL, session=None):
+    """Загружает архив обычным HTTP запросом и разбирает таблицу без браузера"""
+    print("Загрузка страницы (HTTP)...")
+    response = (session or get_http_session()).get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return parse_archive_html(response.text)
+
+def fetch_rows_selenium(url=ARCHIVE_URL, snapshot=True):
+    """Загружает архив через headless Chrome (запасной вариант).
+
+    snapshot=True - вся таблица забирается одним execute_script,
+    иначе ячейки читаются поэлементно через WebDriver.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
     
     chrome_options = Options()
     chrome_options.add_argument("--headless=new")
@@ -139,66 +232,328 @@ def parser():
     chrome_options.add_argument("--window-size=1920,1080")
     
     driver = webdriver.Chrome(options=chrome_options)
-    added_count = 0
-    skipped_count = 0
-    
     try:
-        print("Загрузка страницы...")
-        driver.get("https://www.lotonews.ru/draws/archive/4x20")
+        print("Загрузка страницы (Selenium)...")
+        driver.get(url)
         
         driver.implicitly_wait(10)
         
         table = driver.find_element("tag name", "table")
+        if snapshot:
+            # Один вызов WebDriver вместо нескольких на каждую строку
+            return driver.execute_script(TABLE_SNAPSHOT_SCRIPT, table)
+        
         rows = table.find_elements("tag name", "tr")
+        return [[cell.text for cell in row.find_elements("tag name", "td")] for row in rows]
+    except Exception:
+        driver.save_screenshot("error.png")
+        raise
+    finally:
+        driver.quit()
+
+def extract_draws(rows, stop_at=None):
+    """Преобразует строки таблицы архива в словари тиражей.
+
+    Архив идет от новых тиражей к старым: при stop_at разбор останавливается
+    на первом тираже с номером <= stop_at (он уже есть в БД).
+    Возвращает (тиражи по номеру, количество пропущенных строк, дошли ли до известного тиража).
+    """
+    parsed_draws = {}
+    skipped_count = 0
+    reached_known = False
+    
+    # Первые две строки таблицы - заголовки
+    for cells in rows[2:]:
+        if len(cells) >= 4:
+            date = ' '.join(cells[0].split())
+            draw = cells[1]
+            numbers = [num for num in cells[2].split('\n') if num.isdigit()]
+            
+            if len(numbers) >= 8:
+                draw_number = parse_draw_number(draw)
+                if draw_number == 0:
+                    skipped_count += 1
+                    continue
+                if stop_at is not None and draw_number <= stop_at:
+                    reached_known = True
+                    break
+                
+                numbers_int = [int(num) for num in numbers[:8]]
+                draw_datetime = parse_datetime(date)
+                
+                parsed_draws[draw_number] = {
+                    'номер_тиража': draw_number,
+                    'дата_время_тиража': draw_datetime,
+                    'шар1': numbers_int[0],
+                    'шар2': numbers_int[1],
+                    'шар3': numbers_int[2],
+                    'шар4': numbers_int[3],
+                    'шар5': numbers_int[4],
+                    'шар6': numbers_int[5],
+                    'шар7': numbers_int[6],
+                    'шар8': numbers_int[7]
+                }
+    
+    return parsed_draws, skipped_count, reached_known
+
+def get_last_draw_number(conn=None):
+    """Номер последнего сохраненного тиража или None, если таблица пуста"""
+    try:
+        with use_connection(conn) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT MAX("номер_тиража") FROM lottery_4x20')
+                return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"[ERROR] Ошибка при получении последнего тиража: {e}")
+        return None
+
+def fetch_rows(backend, url=ARCHIVE_URL, selenium_snapshot=True, session=None):
+    """Загружает строки таблицы архива выбранным способом"""
+    if backend == 'selenium':
+        return fetch_rows_selenium(url, snapshot=selenium_snapshot)
+    return fetch_rows_http(url, session)
+
+def scrape_lottery(backend=None, html_file=None, selenium_snapshot=True, full=False, session=None, conn=None):
+    """Парсит архив 4x20 и сохраняет новые тиражи.
+
+    backend: 'http' (по умолчанию) или 'selenium'; html_file - разобрать сохраненную страницу.
+    selenium_snapshot - для Selenium забирать таблицу одним execute_script.
+    По умолчанию разбираются только тиражи новее последнего сохраненного,
+    full=True - разобрать всю страницу.
+    session - HTTP сессия для загрузки (по умолчанию своя на поток),
+    conn - готовое соединение с БД (по умолчанию из общего пула).
+    Возвращает True при успехе, иначе False или JobFailure с типом ошибки для планировщика.
+    """
+    print("Парсер лотереи 4x20")
+    backend = backend or LOTTERY_BACKEND
+    
+    if not test_db_connection(conn):
+        print("Работа парсера прервана из-за ошибки подключения к БД")
+        return False
+    
+    try:
+        last_draw = None if full else get_last_draw_number(conn)
+        if last_draw is not None:
+            print(f"Последний сохраненный тираж: {last_draw}")
+        
+        if html_file:
+            print(f"Разбор сохраненной страницы {html_file}...")
+            with open(html_file, encoding='utf-8') as f:
+                rows = parse_archive_html(f.read())
+        else:
+            rows = fetch_rows(backend, selenium_snapshot=selenium_snapshot, session=session)
         
         print(f"Найдено строк: {len(rows)}")
         print("Обработка данных...")
         
-        for i in range(2, len(rows)):
-            cells = rows[i].find_elements("tag name", "td")
-            if len(cells) >= 4:
-                date = cells[0].text
-                draw = cells[1].text
-                numbers = [num for num in cells[2].text.split('\n') if num.isdigit()]
-                
-                if len(numbers) >= 8:
-                    draw_number = parse_draw_number(draw)
-                    if draw_number == 0:
-                        skipped_count += 1
-                        continue
-                    
-                    numbers_int = [int(num) for num in numbers[:8]]
-                    draw_datetime = parse_datetime(date)
-                    
-                    draw_data = {
-                        'номер_тиража': draw_number,
-                        'дата_время_тиража': draw_datetime,
-                        'шар1': numbers_int[0],
-                        'шар2': numbers_int[1],
-                        'шар3': numbers_int[2],
-                        'шар4': numbers_int[3],
-                        'шар5': numbers_int[4],
-                        'шар6': numbers_int[5],
-                        'шар7': numbers_int[6],
-                        'шар8': numbers_int[7]
-                    }
-                    
-                    if add_draw_to_db(draw_data):
-                        added_count += 1
-                    else:
-                        skipped_count += 1
+        parsed_draws, skipped_count, reached_known = extract_draws(rows, stop_at=last_draw)
+        print(f"Новых тиражей на странице: {len(parsed_draws)}")
+        
+        # Тиражи первой страницы записываем сразу (одним запросом): догрузка старых страниц может не удаться
+        added_numbers = add_draws_to_db(list(parsed_draws.values()), conn=conn)
+        success = added_numbers is not None
+        added_count = len(added_numbers or [])
+        skipped_count += len(parsed_draws) - added_count
+        
+        # На странице нет ни одного известного тиража - есть разрыв, догружаем более старые страницы
+        page = 1
+        while success and last_draw is not None and not reached_known and not html_file and page < GAP_MAX_PAGES:
+            page += 1
+            print(f"Разрыв после тиража {last_draw}, загрузка страницы архива {page}...")
+            try:
+                page_rows = fetch_rows(backend, ARCHIVE_PAGE_URL.format(page=page), selenium_snapshot, session)
+            except Exception as e:
+                print(f"Не удалось загрузить страницу архива {page}: {e}")
+                break
+            page_draws, page_skipped, reached_known = extract_draws(page_rows, stop_at=last_draw)
+            if not page_draws and not reached_known:
+                break
+            print(f"Новых тиражей на странице {page}: {len(page_draws)}")
+            # Тиражи могли сдвинуться между страницами - повторы отбрасывает ON CONFLICT
+            page_added = add_draws_to_db(list(page_draws.values()), conn=conn)
+            if page_added is None:
+                success = False
+                break
+            added_count += len(page_added)
+            skipped_count += page_skipped + len(page_draws) - len(page_added)
+        
+        if last_draw is not None and not reached_known:
+            print(f"[WARN] Не удалось дойти до тиража {last_draw}, возможен пропуск тиражей")
         
         print(f"\n=== Результаты ===")
         print(f"Добавлено: {added_count}")
         print(f"Пропущено: {skipped_count}")
+        return success
         
     except Exception as e:
         print(f"Ошибка парсера: {e}")
-        driver.save_screenshot("error.png")
+        return classify_error(e)
         
     finally:
-        driver.quit()
         print("Парсер завершил работу")
 
+def classify_error(error):
+    """Тип ошибки загрузки архива для планировщика: 429 - лимит запросов,
+    прочие ошибки клиента 4xx и отсутствующий файл - постоянные, остальное временное"""
+    if isinstance(error, FileNotFoundError):
+        return JobFailure(PERMANENT, str(error))
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status == 429:
+        return JobFailure(RATE_LIMITED, "сайт архива ограничил число запросов")
+    if status is not None and 400 <= status < 500 and status != 408:
+        return JobFailure(PERMANENT, f"сайт архива вернул {status}")
+    return False
+
+def load_checkpoint(path=BACKFILL_CHECKPOINT):
+    """Читает контрольную точку загрузки истории"""
+    if not os.path.exists(path):
+        return {'next_page': 1, 'done': False}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_checkpoint(checkpoint, path=BACKFILL_CHECKPOINT):
+    """Атомарно записывает контрольную точку (через временный файл)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def fetch_page_draws(page):
+    """Загружает и разбирает одну страницу архива.
+
+    Возвращает (страница, тиражи по номеру, пропущено строк, страница за концом архива).
+    За концом архива - таблица есть, но строк тиражей в ней нет; страница без таблицы
+    (капча, страница ошибки с кодом 200) концом архива не считается.
+    """
+    rows = fetch_rows_http(ARCHIVE_PAGE_URL.format(page=page))
+    parsed_draws, skipped_count, _ = extract_draws(rows)
+    # Первые две строки таблицы - заголовки
+    past_end = bool(rows) and not any(rows[2:])
+    return page, parsed_draws, skipped_count, past_end
+
+def backfill(workers=BACKFILL_WORKERS, chunk_size=BACKFILL_CHUNK_SIZE, max_pages=None,
+             checkpoint_path=BACKFILL_CHECKPOINT, restart=False):
+    """Загружает всю историю архива 4x20 постранично.
+
+    Страницы загружаются волнами по workers штук параллельно, тиражи волны
+    дедуплицируются и пишутся в БД пачками по chunk_size. После каждой волны
+    сохраняется контрольная точка, прерванная загрузка продолжается с неё.
+    Загрузка заканчивается на первой странице за концом архива. Страница без тиражей,
+    про которую нельзя сказать, что архив закончился, останавливает загрузку
+    с ошибкой, и следующий запуск начнет с неё.
+    Возвращает True, только если загрузка дошла до конца архива или до max_pages.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    print("Загрузка истории лотереи 4x20")
+    
+    if not test_db_connection():
+        print("Загрузка истории прервана из-за ошибки подключения к БД")
+        return False
+    
+    checkpoint = {'next_page': 1, 'done': False} if restart else load_checkpoint(checkpoint_path)
+    if checkpoint.get('done'):
+        print(f"История уже загружена (контрольная точка {checkpoint_path}), для повтора используйте --restart")
+        return True
+    
+    page = checkpoint['next_page']
+    total_added = 0
+    total_skipped = 0
+    previous_wave = set()
+    print(f"Начинаем со страницы {page}, потоков: {workers}")
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while max_pages is None or page <= max_pages:
+                last_page = page + workers - 1
+                if max_pages is not None:
+                    last_page = min(last_page, max_pages)
+                pages = list(range(page, last_page + 1))
+                
+                results = list(executor.map(fetch_page_draws, pages))
+                
+                wave_draws = {}
+                reached_end = False
+                failed_page = None
+                for page_number, page_draws, page_skipped, past_end in results:
+                    if not page_draws:
+                        # Конец архива или непонятная страница - последующие не учитываем
+                        if past_end:
+                            reached_end = True
+                        else:
+                            failed_page = page_number
+                        break
+                    total_skipped += page_skipped
+                    for draw_number, draw_data in page_draws.items():
+                        wave_draws.setdefault(draw_number, draw_data)
+                
+                # Сайт отдает одни и те же тиражи - параметр страницы не работает, дальше идти бессмысленно
+                if wave_draws and set(wave_draws) <= previous_wave:
+                    print(f"[WARN] Страницы {pages[0]}-{pages[-1]} повторяют предыдущие, проверьте ARCHIVE_PAGE_URL")
+                    print(f"Загрузка истории не завершена, добавлено: {total_added}")
+                    return False
+                previous_wave = set(wave_draws)
+                
+                draws = list(wave_draws.values())
+                for start in range(0, len(draws), chunk_size):
+                    added_numbers = add_draws_to_db(draws[start:start + chunk_size], verbose=False)
+                    if added_numbers is None:
+                        print("Загрузка истории остановлена, контрольная точка не сдвинута")
+                        return False
+                    total_added += len(added_numbers)
+                    total_skipped += len(draws[start:start + chunk_size]) - len(added_numbers)
+                
+                page = failed_page if failed_page is not None else last_page + 1
+                checkpoint = {'next_page': page, 'done': reached_end}
+                save_checkpoint(checkpoint, checkpoint_path)
+                if page > pages[0]:
+                    print(f"Страницы {pages[0]}-{page - 1}: тиражей {len(draws)}, всего добавлено {total_added}")
+                
+                if failed_page is not None:
+                    print(f"[WARN] На странице {failed_page} нет тиражей, но и конца архива не видно (капча или ошибка сайта), "
+                          f"загрузка остановлена. Продолжить можно со страницы {failed_page}")
+                    return False
+                if reached_end:
+                    break
+        
+        print(f"\n=== Результаты загрузки истории ===")
+        print(f"Добавлено: {total_added}")
+        print(f"Пропущено: {total_skipped}")
+        return True
+        
+    except Exception as e:
+        print(f"Ошибка загрузки истории: {e}")
+        print(f"Продолжить можно со страницы {page} (контрольная точка {checkpoint_path})")
+        return False
+
 if __name__ == "__main__":
-    parser()
\ No newline at end of file
+    # Установка UTF-8 кодировки для Windows
+    if sys.platform == "win32":
+        sys.stdout.reconfigure(encoding='utf-8')
+        sys.stderr.reconfigure(encoding='utf-8')
+    
+    arg_parser = argparse.ArgumentParser(description="Парсер архива лотереи 4x20")
+    arg_parser.add_argument('--selenium', action='store_true',
+                            help="загружать страницу через headless Chrome вместо HTTP")
+    arg_parser.add_argument('--per-element', action='store_true',
+                            help="с --selenium читать ячейки поэлементно, а не одним снимком таблицы")
+    arg_parser.add_argument('--full', action='store_true',
+                            help="разобрать всю страницу, а не только тиражи новее последнего сохраненного")
+    arg_parser.add_argument('--html', metavar='FILE',
+                            help="разобрать сохраненную HTML страницу архива (без сети)")
+    arg_parser.add_argument('--backfill', action='store_true',
+                            help="загрузить всю историю архива постранично (с продолжением с контрольной точки)")
+    arg_parser.add_argument('--workers', type=int, default=BACKFILL_WORKERS,
+                            help="число параллельных загрузок страниц при --backfill")
+    arg_parser.add_argument('--max-pages', type=int,
+                            help="ограничить --backfill этим номером страницы")
+    arg_parser.add_argument('--restart', action='store_true',
+                            help="начать --backfill заново, игнорируя контрольную точку")
+    args = arg_parser.parse_args()
+    
+    if args.backfill:
+        sys.exit(0 if backfill(workers=args.workers, max_pages=args.max_pages, restart=args.restart) else 1)
+    
+    result = scrape_lottery(backend='selenium' if args.selenium else None, html_file=args.html,
+                            selenium_snapshot=not args.per_element, full=args.full)
+    sys.exit(exit_code(result))
@@ -1,88 +1,138 @@
 # нужно переименовать в parser
-import psycopg2
-from psycopg2.extras import execute_values
 from datetime import datetime
 import os
-from dotenv import load_dotenv
+import sys
+from db import use_connection  # Импорт db также загружает переменные из .env
+from job_status import JobFailure, PERMANENT, RATE_LIMITED, exit_code
 
-# Загружаем переменные из .env файла
-load_dotenv()
+# psycopg2 и weather_api (requests) импортируются при первом использовании:
+# скрипт запускается по расписанию, и без API ключа они не нужны вовсе
 
-def save_weather_to_db(data_weather):
-    """Сохраняет данные о погоде в базу данных PostgreSQL"""
+# Объект API, переиспользуемый между запусками в одном процессе (сессия и кэш остаются прогретыми)
+default_weather_api = None
+
+def save_weather_to_db(weather_records, conn=None):
+    """Сохраняет данные о погоде (одну запись или список) в базу данных PostgreSQL одним запросом
+
+    conn - готовое соединение; если не передано, берется из общего пула.
+    """
     
-    # Данные для подключения к БД.
-    db_config = {
-        'host': os.getenv('DB_HOST'),           # Берем только из .env
-        'port': os.getenv('DB_PORT'),           
-        'database': os.getenv('DB_NAME'),       
-        'user': os.getenv('DB_USER'),           
-        'password': os.getenv('DB_PASSWORD')  
-    }
+    if isinstance(weather_records, dict):
+        weather_records = [weather_records]
+    if not weather_records:
+        return True
+    
+    import psycopg2
+    from psycopg2.extras import execute_values
     
     try:
-        # Подключаемся к базе данных
-        conn = psycopg2.connect(**db_config)
-        cursor = conn.cursor()
-        
-        # SQL запрос для вставки данных
-        insert_query = """
-        INSERT INTO data_weather (
-            "время_наблюдения",
-            "давление", 
-            "влажность",
-            "тип_осадков",
-            "скорость_ветра",
-            "температура",
-            "направление_ветра"
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        # Подготавливаем данные для вставки
-        data_to_insert = (
-            data_weather['observation_time'],  # время_наблюдения
-            data_weather['pressure'],          # давление
-            data_weather['humidity'],          # влажность
-            data_weather['precipitation'],     # тип_осадков
-            data_weather['wind_speed'],        # скорость_ветра
-            data_weather['temperature'],       # температура
-            data_weather['wind_direction']     # направление_ветра
-        )
-        
-        # Выполняем запрос
-        cursor.execute(insert_query, data_to_insert)
-        
-        # Подтверждаем изменения
-        conn.commit()
-        
-        print("Данные успешно сохранены в базу данных!")
+        # Берем переданное соединение или соединение из общего пула
+        with use_connection(conn) as conn:
+            with conn.cursor() as cursor:
+                # SQL запрос для вставки данных (наблюдение города с тем же временем провайдера пропускается)
+                insert_query = """
+                INSERT INTO data_weather (
+                    "время_наблюдения",
+                    "давление", 
+                    "влажность",
+                    "тип_осадков",
+                    "скорость_ветра",
+                    "температура",
+                    "направление_ветра",
+                    "город"
+                ) VALUES %s
+                ON CONFLICT ("город", "время_наблюдения") DO NOTHING
+                RETURNING "время_наблюдения"
+                """
+                
+                # Подготавливаем данные для вставки
+                data_to_insert = [(
+                    data_weather['observation_time'],  # время_наблюдения
+                    data_weather['pressure'],          # давление
+                    data_weather['humidity'],          # влажность
+                    data_weather['precipitation'],     # тип_осадков
+                    data_weather['wind_speed'],        # скорость_ветра
+                    data_weather['temperature'],       # температура
+                    data_weather['wind_direction'],    # направление_ветра
+                    data_weather['city']               # город
+                ) for data_weather in weather_records]
+                
+                # Выполняем запрос
+                inserted = execute_values(cursor, insert_query, data_to_insert, fetch=True)
+            
+            # Подтверждаем изменения
+            conn.commit()
         
-    except psycopg2.IntegrityError:
-        # Если запись с таким временем наблюдения уже существует
-        print("Запись с таким временем наблюдения уже существует в базе")
-        conn.rollback()
+        print(f"Данные успешно сохранены в базу данных! Записей: {len(inserted)}")
+        if len(inserted) < len(weather_records):
+            print(f"Пропущено уже существующих записей: {len(weather_records) - len(inserted)}")
+        return True
         
     except psycopg2.Error as e:
         print(f"Ошибка при работе с базой данных: {e}")
-        conn.rollback()
-        
-    finally:
-        # Закрываем соединение
-        if conn:
-            cursor.close()
-            conn.close()
+        return False
+
+def get_weather_cities():
+    """Города для сбора погоды (WEATHER_CITIES через запятую в .env)"""
+    return [city.strip() for city in os.getenv('WEATHER_CITIES', 'Moscow').split(',') if city.strip()]
 
-# Основной код
-from weather_api import WeatherAPI
+def get_weather_city_ids():
+    """ID городов OpenWeather (WEATHER_CITY_IDS через запятую); если заданы, погода берется через endpoint group"""
+    return [city_id.strip() for city_id in os.getenv('WEATHER_CITY_IDS', '').split(',') if city_id.strip()]
 
-# Создаем объект погодного API
-weather_api = WeatherAPI()
+def get_default_weather_api():
+    """Объект WeatherAPI, создаваемый один раз на процесс"""
+    global default_weather_api
+    if default_weather_api is None:
+        from weather_api import WeatherAPI
+        default_weather_api = WeatherAPI()
+    return default_weather_api
 
-# Получаем реальные данные о погоде
-data_weather = weather_api.get_data_weather(datetime.now(), "Moscow")
+def collect_weather(cities=None, city_ids=None, weather_api=None, conn=None):
+    """Сбор погоды и сохранение в БД.
+
+    cities / city_ids - города по названию или ID OpenWeather (по умолчанию из .env),
+    weather_api - готовый WeatherAPI (его сессия и кэш), conn - готовое соединение с БД.
+    Возвращает True при успехе, иначе False или JobFailure с типом ошибки для планировщика.
+    """
+    if weather_api is None:
+        if not os.getenv('OPENWEATHER_API_KEY'):
+            print("API ключ не найден в .env файле, сбор погоды пропущен")
+            return JobFailure(PERMANENT, "нет API ключа")
+        weather_api = get_default_weather_api()
+    # Объект API может жить дольше одного запуска (планировщик), статистика считается за этот запуск
+    weather_api.reset_stats()
+    if city_ids is None and cities is None:
+        city_ids = get_weather_city_ids()
+    cities = cities if cities is not None else get_weather_cities()
+    
+    # Получаем реальные данные о погоде сразу для всех городов (параллельно)
+    if city_ids:
+        weather_records = weather_api.get_data_weather_group(datetime.now(), city_ids)
+    else:
+        weather_records = weather_api.get_data_weather_many(datetime.now(), cities)
+    
+    stats = weather_api.latency_stats()
+    print(f"Запросов к API: {stats['count']}, среднее время: {stats['avg']:.2f} сек, максимум: {stats['max']:.2f} сек")
+    
+    if weather_api.cache:
+        cache_stats = weather_api.cache.stats()
+        print(f"Кэш погоды: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}, "
+              f"без изменений {cache_stats['unchanged']}")
+    
+    if weather_records:
+        # Сохраняем все наблюдения, в том числе из кэша: прошлое сохранение могло не удаться,
+        # а уже записанные строки отбрасывает ON CONFLICT ("город", "время_наблюдения")
+        return save_weather_to_db(weather_records, conn)
+    else:
+        print("Не удалось получить данные о погоде")
+        # Статусы ответов этого запуска подсказывают, стоит ли повторять
+        statuses = weather_api.response_statuses
+        if 401 in statuses:
+            return JobFailure(PERMANENT, "неверный API ключ")
+        if 429 in statuses:
+            return JobFailure(RATE_LIMITED, "превышен лимит запросов API")
+        return False
 
-if data_weather:
-    # Сохраняем данные в базу данных
-    save_weather_to_db(data_weather)
-else:
-    print("Не удалось получить данные о погоде")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(exit_code(collect_weather()))
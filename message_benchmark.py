@@ -0,0 +1,126 @@
+# Микробенчмарк форматирования и разбиения сообщений BotDataSender на синтетических данных
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from itertools import chain
+
+from data_sender_bot import BotDataSender, MESSAGE_DATA_LIMIT, MESSAGE_PART_LENGTH, TELEGRAM_MESSAGE_LIMIT
+
+# Число синтетических строк по умолчанию
+BENCHMARK_ROWS = 100_000
+
+
+def make_rows(count):
+    """Синтетические строки в формате total_results"""
+    started = datetime(2024, 1, 1, 9, 0)
+    return [{
+        'номер_тиража': 100000 + i,
+        'дата_время_тиража': started + timedelta(minutes=15 * i),
+        'шар1': i % 20 + 1,
+        'шар2': (i * 7) % 20 + 1,
+        'температура': round(-10 + (i % 400) / 10, 1),
+        'погодные_условия': 'облачно с прояснениями',
+        'разница_времени_минуты': i % 11,
+    } for i in range(count)]
+
+
+def legacy_format(data, max_records):
+    """Прежнее форматирование: один растущий текст через +="""
+    formatted_text = f"Найдено записей: {len(data)}\n"
+    formatted_text += f"Время выгрузки: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    for i, record in enumerate(data[:max_records], 1):
+        formatted_text += f"Запись #{i}:\n"
+        for key, value in record.items():
+            if value and len(str(value)) > 50:
+                value = str(value)[:47] + "..."
+            formatted_text += f"   • {key}: {value}\n"
+        formatted_text += "\n"
+    return formatted_text
+
+
+def legacy_split(text, max_length=MESSAGE_PART_LENGTH):
+    """Прежнее разбиение: остаток текста копируется после каждой части"""
+    parts = []
+    while text:
+        if len(text) <= max_length:
+            parts.append(text)
+            break
+        split_pos = text.rfind('\n\n', 0, max_length)
+        if split_pos == -1:
+            split_pos = text.rfind('\n', 0, max_length)
+        if split_pos == -1:
+            split_pos = max_length
+        parts.append(text[:split_pos])
+        text = text[split_pos:].lstrip()
+    return parts
+
+
+def timed(function):
+    """Результат функции и время выполнения (сек)"""
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def estimate_exceeds_limit(rows):
+    """Решение "отправлять файлом" по накопленной оценке размера, как в migrate_data_to_bot"""
+    size = 0
+    for record in rows:
+        size += len(str(record)) + 2
+        if size > MESSAGE_DATA_LIMIT:
+            return True
+    return False
+
+
+def main():
+    """Основная функция. Код возврата 1 - часть длиннее лимита Telegram или расхождение с прежним разбиением"""
+    arg_parser = argparse.ArgumentParser(description="Микробенчмарк форматирования сообщений бота")
+    arg_parser.add_argument('--rows', type=int, default=BENCHMARK_ROWS, help="число синтетических строк")
+    arg_parser.add_argument('--skip-legacy', action='store_true',
+                            help="не замерять прежнюю реализацию (она квадратичная)")
+    args = arg_parser.parse_args()
+
+    sender = BotDataSender(bot_token='benchmark', chat_id='benchmark')
+    rows = make_rows(args.rows)
+    print(f"Строк: {len(rows)}")
+
+    # Выбор между сообщением и файлом
+    decision, full_time = timed(lambda: len(str(rows)) > MESSAGE_DATA_LIMIT)
+    early_decision, early_time = timed(lambda: estimate_exceeds_limit(rows))
+    print(f"Выбор файла: len(str(data)) {full_time * 1000:.1f} мс, "
+          f"накопленная оценка {early_time * 1000:.3f} мс (одинаково: {decision == early_decision})")
+
+    # Форматирование всех строк и разбиение на части
+    def render():
+        pieces = chain(["✅ Бенчмарк\n\n"], sender.render_records(rows, max_records=len(rows)))
+        return list(sender.iter_message_chunks(pieces))
+
+    chunks, render_time = timed(render)
+    longest = max(len(chunk) for chunk in chunks)
+    prefix = len(f"Часть {len(chunks)}/{len(chunks)}\n\n")
+    print(f"Генератор частей: {render_time:.2f} сек, частей {len(chunks)}, самая длинная {longest} символов")
+
+    text = "✅ Бенчмарк\n\n" + sender.format_data_for_telegram(rows, max_records=len(rows))
+    parts, split_time = timed(lambda: sender.split_long_message(text))
+    print(f"split_long_message: {split_time:.2f} сек, частей {len(parts)}")
+
+    success = longest + prefix <= TELEGRAM_MESSAGE_LIMIT
+    if not success:
+        print(f"✗ Часть с заголовком длиннее лимита Telegram ({TELEGRAM_MESSAGE_LIMIT})")
+
+    if not args.skip_legacy:
+        _, legacy_format_time = timed(lambda: "✅ Бенчмарк\n\n" + legacy_format(rows, len(rows)))
+        # Разбивается тот же текст, что и выше (время выгрузки в заголовке могло смениться)
+        legacy_parts, legacy_split_time = timed(lambda: legacy_split(text))
+        print(f"Прежняя реализация: форматирование {legacy_format_time:.2f} сек, "
+              f"разбиение {legacy_split_time:.2f} сек, частей {len(legacy_parts)}")
+        if [part.strip() for part in legacy_parts] != [part.strip() for part in parts]:
+            print("✗ split_long_message разбивает текст иначе, чем прежняя реализация")
+            success = False
+
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -3,17 +3,65 @@ import logging
 import time
 import subprocess
 import sys
+import os
 import signal
 import threading
+import importlib
+import contextvars
+import traceback
+import random
+from collections import deque
 from log_config import setup_logging
-from datetime import datetime
-
-setup_logging()
+from job_status import JobFailure, TRANSIENT, RATE_LIMITED, PERMANENT, failure_kind, failure_from_exit_code
+from datetime import datetime, date
 
 is_running = True
 # ПЕРЕКЛЮЧАТЕЛЬ: True - вывод в консоль, False - только в файл логов
 CONSOLE_OUTPUT = True
 
+# Режим запуска задач: subprocess - отдельный процесс на каждый запуск (с ограничением времени
+# SCRIPT_TIMEOUT), inprocess - вызов функции в процессе планировщика (импорты, HTTP сессии
+# и пул соединений с БД остаются прогретыми, но зависшую задачу нельзя остановить)
+EXECUTION_MODE = os.getenv('SCHEDULER_MODE', 'subprocess')
+# Скрипты, которые всегда запускаются отдельным процессом (через запятую)
+SUBPROCESS_JOBS = {name.strip() for name in os.getenv('SUBPROCESS_JOBS', '').split(',') if name.strip()}
+
+# Точки входа для запуска внутри процесса: скрипт -> (модуль, функция). Функция возвращает True при успехе
+ENTRY_POINTS = {
+    "main.py": ("main", "collect_weather"),
+    "lottery_parser.py": ("lottery_parser", "scrape_lottery"),
+}
+entry_point_cache = {}
+# Ограничение времени выполнения скрипта отдельным процессом (сек)
+SCRIPT_TIMEOUT = 170
+# Сколько последних строк вывода процесса держать в памяти для консоли (весь вывод идет в лог)
+OUTPUT_TAIL_LINES = 50
+# Максимальная длина строки вывода, читаемой за раз (символов)
+OUTPUT_MAX_LINE = 64 * 1024
+# Сколько ждать дочитывания вывода после завершения процесса (сек)
+OUTPUT_JOIN_TIMEOUT = 5
+
+
+# Повторы неудачных запусков: число попыток, база и потолок экспоненциальной паузы (сек)
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', 3))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', 5))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', 120))
+# Минимальная пауза после превышения лимита запросов (сек)
+RATE_LIMIT_DELAY = float(os.getenv('RATE_LIMIT_DELAY', 60))
+# Сколько повторов задача может израсходовать за сутки (защита от бесконечных перезапусков)
+RETRY_BUDGET = int(os.getenv('RETRY_BUDGET', 6))
+# Настройки повторов отдельных задач поверх общих
+JOB_RETRY_POLICIES = {
+    # Архив лотереи загружается раз в день, поэтому попыток больше, а паузы длиннее
+    "lottery_parser.py": {'max_attempts': 4, 'base_delay': 15, 'max_delay': 300},
+}
+# Сколько последних запусков учитывать в статистике времени выполнения
+LATENCY_WINDOW = 100
+
+# Счетчики запусков, повторов и времени выполнения по задачам
+job_stats = {}
+job_stats_lock = threading.Lock()
+
 def signal_handler(signum, frame):
     global is_running
     if CONSOLE_OUTPUT:
@@ -25,8 +73,66 @@ def setup_signal_handlers():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
+class ThreadOutput:
+    """Поток вывода, который пишет в лог задачи для потока этой задачи и в исходный поток для остальных.
+
+    Устанавливается вместо sys.stdout/sys.stderr один раз, поэтому вывод планировщика
+    (команды консоли, сообщения о запуске) не попадает в лог задачи, выполняемой внутри процесса.
+    Поток вывода хранится в contextvars: пулы потоков задачи, которые передают контекст
+    (weather_api.map_with_context), тоже пишут в лог задачи.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.stream = contextvars.ContextVar(f'thread_output_{id(self)}', default=None)
+
+    def current(self):
+        return self.stream.get() or self.default
+
+    def redirect(self, stream):
+        """Направляет вывод текущего потока в stream (None - обратно в исходный поток)"""
+        self.stream.set(stream)
+
+    def write(self, text):
+        return self.current().write(text)
+
+    def flush(self):
+        self.current().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.current(), name)
+
+def install_thread_output():
+    """Заменяет sys.stdout и sys.stderr на ThreadOutput (один раз) и возвращает их"""
+    if not isinstance(sys.stdout, ThreadOutput):
+        sys.stdout = ThreadOutput(sys.stdout)
+    if not isinstance(sys.stderr, ThreadOutput):
+        sys.stderr = ThreadOutput(sys.stderr)
+    return sys.stdout, sys.stderr
+
+def stream_output(pipe, stream_name, log_file, write_lock, tail):
+    """Читает вывод процесса построчно и сразу пишет его в лог с отметкой времени.
+
+    В памяти остаются только последние строки (tail) для вывода в консоль,
+    слишком длинная строка читается частями по OUTPUT_MAX_LINE символов.
+    """
+    try:
+        for line in iter(lambda: pipe.readline(OUTPUT_MAX_LINE), ''):
+            line = line.rstrip('\n')
+            with write_lock:
+                log_file.write(f"{datetime.now():%H:%M:%S} {stream_name}: {line}\n")
+            tail.append(line)
+    except (OSError, ValueError) as e:
+        logging.error(f"Ошибка чтения вывода ({stream_name}): {e}")
+    finally:
+        pipe.close()
+
 def run_script(script_name):
-    """Запускает скрипт и возвращает результат"""
+    """Запускает скрипт отдельным процессом и возвращает результат.
+
+    Вывод процесса пишется в лог задачи по мере появления (фоновые потоки чтения),
+    поэтому долгий запуск виден в логе сразу, а при превышении времени вывод не теряется.
+    """
     try:
         if CONSOLE_OUTPUT:
             print(f"Запуск {script_name}...")
@@ -34,59 +140,271 @@ def run_script(script_name):
         
         current_date = datetime.now().strftime("%Y-%m-%d")
         log_filename = f"logs/{script_name.replace('.py', '')}_{current_date}.log"
-        
-        import os
         os.makedirs("logs", exist_ok=True)
         
-        # Запускаем скрипт и перехватываем вывод
-        result = subprocess.run(
-            [sys.executable, script_name], 
-            timeout=170,
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            cwd=os.getcwd()
-        )
+        # Дочерний процесс пишет без буферизации, иначе вывод придет только при завершении
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        tails = {name: deque(maxlen=OUTPUT_TAIL_LINES) for name in ("STDOUT", "STDERR")}
+        write_lock = threading.Lock()
+        timed_out = False
         
-        # Записываем вывод в лог-файл (ВСЕГДА)
-        with open(log_filename, "a", encoding='utf-8') as log_file:
+        with open(log_filename, "a", encoding='utf-8', buffering=1) as log_file:
             log_file.write(f"=== Запуск {script_name} в {datetime.now()} ===\n")
-            if result.stdout:
-                log_file.write("STDOUT:\n" + result.stdout + "\n")
-            if result.stderr:
-                log_file.write("STDERR:\n" + result.stderr + "\n")
-            log_file.write(f"Код возврата: {result.returncode}\n")
-            log_file.write("=" * 50 + "\n\n")
+            
+            process = subprocess.Popen(
+                [sys.executable, script_name],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                cwd=os.getcwd(),
+                env=env
+            )
+            readers = [
+                threading.Thread(target=stream_output, daemon=True,
+                                 args=(process.stdout, "STDOUT", log_file, write_lock, tails["STDOUT"])),
+                threading.Thread(target=stream_output, daemon=True,
+                                 args=(process.stderr, "STDERR", log_file, write_lock, tails["STDERR"])),
+            ]
+            for reader in readers:
+                reader.start()
+            
+            try:
+                returncode = process.wait(timeout=SCRIPT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                process.kill()
+                returncode = process.wait()
+            
+            # Дочитываем остаток вывода; процессы-потомки (например, браузер) могут держать канал открытым
+            for reader in readers:
+                reader.join(timeout=OUTPUT_JOIN_TIMEOUT)
+            
+            with write_lock:
+                if timed_out:
+                    log_file.write(f"Превышено время выполнения ({SCRIPT_TIMEOUT} сек), процесс остановлен\n")
+                log_file.write(f"Код возврата: {returncode}\n")
+                log_file.write("=" * 50 + "\n\n")
+        
+        if timed_out:
+            if CONSOLE_OUTPUT:
+                print(f"{script_name} превышено время выполнения ({SCRIPT_TIMEOUT} сек)")
+            logging.error(f"{script_name} превышено время выполнения ({SCRIPT_TIMEOUT} сек)")
+            return JobFailure(TRANSIENT, "превышено время выполнения")
         
-        # Выводим результат в консоль (ТОЛЬКО ЕСЛИ CONSOLE_OUTPUT = True)
-        if result.returncode == 0:
+        # Выводим результат в консоль (ТОЛЬКО ЕСЛИ CONSOLE_OUTPUT = True), полный вывод - в логе
+        job_result = failure_from_exit_code(returncode)
+        if job_result:
             if CONSOLE_OUTPUT:
                 print(f"{script_name} завершен успешно")
-                if result.stdout:
-                    print(f"Вывод {script_name}:\n{result.stdout}")
+                if tails["STDOUT"]:
+                    print(f"Вывод {script_name} (последние строки):\n" + "\n".join(tails["STDOUT"]))
             logging.info(f"{script_name} завершен успешно")
             return True
         else:
             if CONSOLE_OUTPUT:
-                print(f"{script_name} завершен с ошибкой. Код: {result.returncode}")
-                if result.stderr:
-                    print(f"Ошибка {script_name}:\n{result.stderr}")
-            logging.error(f"{script_name} завершен с ошибкой. Код: {result.returncode}")
-            return False
+                print(f"{script_name} завершен с ошибкой. Код: {returncode}")
+                if tails["STDERR"]:
+                    print(f"Ошибка {script_name} (последние строки):\n" + "\n".join(tails["STDERR"]))
+            logging.error(f"{script_name} завершен с ошибкой. Код: {returncode} ({job_result.kind})")
+            return job_result
             
-    except subprocess.TimeoutExpired:
+    except Exception as e:
+        if CONSOLE_OUTPUT:
+            print(f"Ошибка при запуске {script_name}: {e}")
+        logging.error(f"Ошибка при запуске {script_name}: {e}")
+        return JobFailure(TRANSIENT, str(e))
+
+def get_entry_point(script_name):
+    """Импортирует модуль скрипта один раз и возвращает функцию точки входа"""
+    if script_name not in entry_point_cache:
+        module_name, function_name = ENTRY_POINTS[script_name]
+        module = importlib.import_module(module_name)
+        entry_point_cache[script_name] = getattr(module, function_name)
+    return entry_point_cache[script_name]
+
+def use_subprocess(script_name):
+    """Нужно ли запускать скрипт отдельным процессом"""
+    return (EXECUTION_MODE == 'subprocess' or script_name in SUBPROCESS_JOBS
+            or script_name not in ENTRY_POINTS)
+
+def load_entry_points():
+    """Заранее импортирует скрипты, которые запускаются внутри процесса"""
+    for script_name in ENTRY_POINTS:
+        if use_subprocess(script_name):
+            continue
+        try:
+            get_entry_point(script_name)
+            logging.info(f"Точка входа {script_name} загружена")
+        except Exception as e:
+            logging.error(f"Не удалось загрузить {script_name}: {e}")
+
+def run_inprocess(script_name):
+    """Вызывает точку входа скрипта в текущем процессе, вывод потока задачи пишется в лог задачи.
+
+    Ограничение по времени (SCRIPT_TIMEOUT) здесь не действует: функцию нельзя прервать
+    так же, как процесс. Поэтому режим включается только явно (SCHEDULER_MODE=inprocess),
+    а задачи, которые могут зависнуть, стоит оставить в SUBPROCESS_JOBS.
+    """
+    try:
+        if CONSOLE_OUTPUT:
+            print(f"Запуск {script_name} (в процессе)...")
+        logging.info(f"Запуск {script_name} (в процессе)...")
+        
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        log_filename = f"logs/{script_name.replace('.py', '')}_{current_date}.log"
+        os.makedirs("logs", exist_ok=True)
+        
+        entry_point = get_entry_point(script_name)
+        stdout, stderr = install_thread_output()
+        started = time.perf_counter()
+        
+        with open(log_filename, "a", encoding='utf-8', buffering=1) as log_file:
+            log_file.write(f"=== Запуск {script_name} в {datetime.now()} (в процессе) ===\n")
+            stdout.redirect(log_file)
+            stderr.redirect(log_file)
+            try:
+                result = entry_point()
+            except SystemExit as e:
+                result = failure_from_exit_code(e.code)
+            except Exception as e:
+                traceback.print_exc()
+                result = JobFailure(TRANSIENT, str(e))
+            finally:
+                stdout.redirect(None)
+                stderr.redirect(None)
+            elapsed = time.perf_counter() - started
+            kind = failure_kind(result)
+            log_file.write(f"Результат: {'успех' if kind is None else 'ошибка (' + kind + ')'}, время: {elapsed:.2f} сек\n")
+            log_file.write("=" * 50 + "\n\n")
+        
+        if kind is None:
+            if CONSOLE_OUTPUT:
+                print(f"{script_name} завершен успешно за {elapsed:.2f} сек")
+            logging.info(f"{script_name} завершен успешно за {elapsed:.2f} сек")
+            return True
         if CONSOLE_OUTPUT:
-            print(f"{script_name} превышено время выполнения (170 сек)")
-        logging.error(f"{script_name} превышено время выполнения (170 сек)")
-        return False
+            print(f"{script_name} завершен с ошибкой ({kind}), подробности в {log_filename}")
+        logging.error(f"{script_name} завершен с ошибкой ({kind}, в процессе)")
+        return result if isinstance(result, JobFailure) else JobFailure(kind)
+        
     except Exception as e:
         if CONSOLE_OUTPUT:
             print(f"Ошибка при запуске {script_name}: {e}")
         logging.error(f"Ошибка при запуске {script_name}: {e}")
-        return False
+        return JobFailure(TRANSIENT, str(e))
+
+def run_job(script_name):
+    """Запускает скрипт в выбранном режиме"""
+    if use_subprocess(script_name):
+        return run_script(script_name)
+    return run_inprocess(script_name)
+
+def get_retry_policy(script_name):
+    """Настройки повторов задачи: общие значения из .env и переопределения из JOB_RETRY_POLICIES"""
+    policy = {
+        'max_attempts': RETRY_MAX_ATTEMPTS,
+        'base_delay': RETRY_BASE_DELAY,
+        'max_delay': RETRY_MAX_DELAY,
+        'rate_limit_delay': RATE_LIMIT_DELAY,
+        'budget': RETRY_BUDGET,
+    }
+    policy.update(JOB_RETRY_POLICIES.get(script_name, {}))
+    return policy
+
+def retry_delay(policy, retry_number, kind):
+    """Пауза перед повтором: экспоненциальный рост с потолком и случайным разбросом.
+
+    При превышении лимита запросов пауза не короче rate_limit_delay.
+    """
+    delay = min(policy['max_delay'], policy['base_delay'] * 2 ** retry_number)
+    # Разброс от половины до полной паузы, чтобы повторы разных задач не совпадали
+    delay = random.uniform(delay / 2, delay)
+    if kind == RATE_LIMITED:
+        delay = max(delay, policy['rate_limit_delay'] * random.uniform(1, 1.5))
+    return delay
+
+def get_job_stats(script_name):
+    """Счетчики задачи (создаются при первом запуске); вызывается под job_stats_lock"""
+    stats = job_stats.get(script_name)
+    if stats is None:
+        stats = {
+            'runs': 0,
+            'successes': 0,
+            'failures': {TRANSIENT: 0, RATE_LIMITED: 0, PERMANENT: 0},
+            'retries': 0,
+            'budget_exhausted': 0,
+            'latencies': deque(maxlen=LATENCY_WINDOW),
+            'budget_date': None,
+            'budget_used': 0,
+        }
+        job_stats[script_name] = stats
+    return stats
+
+def record_run(script_name, kind, elapsed):
+    """Учитывает запуск задачи: результат и время выполнения"""
+    with job_stats_lock:
+        stats = get_job_stats(script_name)
+        stats['runs'] += 1
+        stats['latencies'].append(elapsed)
+        if kind is None:
+            stats['successes'] += 1
+        else:
+            stats['failures'][kind] += 1
+
+def take_retry_budget(script_name, policy):
+    """Списывает один повтор из суточного бюджета задачи. False - бюджет исчерпан"""
+    with job_stats_lock:
+        stats = get_job_stats(script_name)
+        today = date.today()
+        if stats['budget_date'] != today:
+            stats['budget_date'] = today
+            stats['budget_used'] = 0
+        if stats['budget_used'] >= policy['budget']:
+            stats['budget_exhausted'] += 1
+            return False
+        stats['budget_used'] += 1
+        stats['retries'] += 1
+        return True
+
+def format_job_stats():
+    """Строки со счетчиками запусков, повторов и временем выполнения по задачам"""
+    lines = []
+    with job_stats_lock:
+        for script_name, stats in sorted(job_stats.items()):
+            latencies = list(stats['latencies'])
+            average = sum(latencies) / len(latencies) if latencies else 0.0
+            maximum = max(latencies) if latencies else 0.0
+            failures = stats['failures']
+            lines.append(
+                f"{script_name}: запусков {stats['runs']}, успешно {stats['successes']}, "
+                f"ошибок {failures[TRANSIENT]} временных / {failures[RATE_LIMITED]} лимит / "
+                f"{failures[PERMANENT]} постоянных, повторов {stats['retries']} "
+                f"(бюджет исчерпан {stats['budget_exhausted']} раз), "
+                f"время среднее {average:.2f} сек, максимум {maximum:.2f} сек"
+            )
+    return lines
+
+def wait_for_retry(seconds):
+    """Пауза перед повтором, прерываемая сигналом остановки. False - получен сигнал остановки"""
+    deadline = time.monotonic() + seconds
+    while is_running:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return True
+        time.sleep(min(1, remaining))
+    return False
 
-def run_with_restart(script_name, max_attempts=3):
-    """Запускает скрипт с перезапуском в случае неудачи"""
+def run_with_restart(script_name, max_attempts=None):
+    """Запускает скрипт с повторами в зависимости от типа ошибки.
+
+    Постоянные ошибки не повторяются, временные повторяются с экспоненциальной
+    паузой и разбросом, после превышения лимита запросов пауза дольше.
+    Повторы ограничены числом попыток и суточным бюджетом задачи.
+    """
+    policy = get_retry_policy(script_name)
+    max_attempts = max_attempts or policy['max_attempts']
     if CONSOLE_OUTPUT:
         print(f"Запуск {script_name} с перезапуском (макс. попыток: {max_attempts})")
     logging.info(f"Запуск {script_name} с перезапуском (макс. попыток: {max_attempts})")
@@ -102,34 +420,49 @@ def run_with_restart(script_name, max_attempts=3):
             print(f"Попытка {attempt + 1} для {script_name}")
         logging.info(f"Попытка {attempt + 1} для {script_name}")
         
-        success = run_script(script_name)
+        started = time.perf_counter()
+        result = run_job(script_name)
+        kind = failure_kind(result)
+        record_run(script_name, kind, time.perf_counter() - started)
         
-        if success:
+        if kind is None:
             if CONSOLE_OUTPUT:
                 print(f"Успех! {script_name} выполнен с попытки {attempt + 1}")
             logging.info(f"Успех! {script_name} выполнен с попытки {attempt + 1}")
             return True
-        else:
+        
+        reason = getattr(result, 'reason', '')
+        if CONSOLE_OUTPUT:
+            print(f"Запуск {script_name} завершился с ошибкой {kind} (попытка {attempt + 1}) {reason}".rstrip())
+        logging.warning(f"Запуск {script_name} завершился с ошибкой {kind} (попытка {attempt + 1}) {reason}".rstrip())
+        
+        if kind == PERMANENT:
             if CONSOLE_OUTPUT:
-                print(f"Запуск {script_name} завершился с ошибкой (попытка {attempt + 1})")
-            logging.warning(f"Запуск {script_name} завершился с ошибкой (попытка {attempt + 1})")
-            
-            if attempt < max_attempts - 1:
-                wait_time = 10
-                if CONSOLE_OUTPUT:
-                    print(f"Перезапуск через {wait_time} секунд...")
-                logging.info(f"Перезапуск через {wait_time} секунд...")
-                for i in range(wait_time):
-                    if not is_running:
-                        if CONSOLE_OUTPUT:
-                            print("Прервано ожидание перезапуска")
-                        logging.info("Прервано ожидание перезапуска")
-                        return False
-                    time.sleep(1)
-            else:
-                if CONSOLE_OUTPUT:
-                    print(f"Все {max_attempts} попыток запуска {script_name} провалились")
-                logging.error(f"Все {max_attempts} попыток запуска {script_name} провалились")
+                print(f"Ошибка {script_name} постоянная, повтор не поможет")
+            logging.error(f"Ошибка {script_name} постоянная, повторы отменены")
+            return False
+        
+        if attempt == max_attempts - 1:
+            if CONSOLE_OUTPUT:
+                print(f"Все {max_attempts} попыток запуска {script_name} провалились")
+            logging.error(f"Все {max_attempts} попыток запуска {script_name} провалились")
+            return False
+        
+        if not take_retry_budget(script_name, policy):
+            if CONSOLE_OUTPUT:
+                print(f"Бюджет повторов {script_name} на сегодня исчерпан ({policy['budget']})")
+            logging.error(f"Бюджет повторов {script_name} на сегодня исчерпан ({policy['budget']})")
+            return False
+        
+        wait_time = retry_delay(policy, attempt, kind)
+        if CONSOLE_OUTPUT:
+            print(f"Перезапуск через {wait_time:.1f} секунд...")
+        logging.info(f"Перезапуск {script_name} через {wait_time:.1f} секунд ({kind})")
+        if not wait_for_retry(wait_time):
+            if CONSOLE_OUTPUT:
+                print("Прервано ожидание перезапуска")
+            logging.info("Прервано ожидание перезапуска")
+            return False
     
     return False
 
@@ -140,6 +473,8 @@ def run_lottery_parser():
         print("Запуск lottery_parser.py по расписанию")
     logging.info("Запуск lottery_parser.py по расписанию")
     run_with_restart("lottery_parser.py")
+    for line in format_job_stats():
+        logging.info(f"Статистика: {line}")
 
 def run_main_parser():
     if not is_running:
@@ -148,6 +483,8 @@ def run_main_parser():
         print("Запуск main.py по расписанию")
     logging.info("Запуск main.py по расписанию")
     run_with_restart("main.py")
+    for line in format_job_stats():
+        logging.info(f"Статистика: {line}")
 
 def user_input_listener():
     global is_running
@@ -162,10 +499,12 @@ def user_input_listener():
             elif user_input in ['status', 'статус']:
                 if CONSOLE_OUTPUT:
                     print(f"Статус: {'работает' if is_running else 'останавливается'}")
+                    for line in format_job_stats():
+                        print(line)
             elif user_input in ['help', 'помощь']:
                 if CONSOLE_OUTPUT:
                     print("Команды: stop, exit, quit, стоп, выход - остановить")
-                    print("status, статус - показать статус")
+                    print("status, статус - показать статус и статистику запусков")
                     print("help, помощь - справка")
             else:
                 if CONSOLE_OUTPUT:
@@ -179,11 +518,16 @@ def user_input_listener():
 def main():
     global is_running
     
+    # Логирование настраивается при запуске, а не при импорте (импорт не создает logs/ и не удаляет логи)
+    setup_logging()
+    
     if CONSOLE_OUTPUT:
         print("Запуск планировщика парсеров")
         print("main.py - запускается в 10:02, 12:02, 13:02, 16:02, 16:22, 18:02, 20:02, 22:02")
         print("lottery_parser.py - запускается в 09:30")
-        print("Каждый скрипт имеет 3 попытки запуска с перезапуском через 10 секунд")
+        print(f"Повторы при ошибках: до {RETRY_MAX_ATTEMPTS} попыток, пауза от {RETRY_BASE_DELAY:g} сек с ростом в 2 раза "
+              f"(не больше {RETRY_MAX_DELAY:g} сек), постоянные ошибки не повторяются")
+        print(f"Режим запуска: {EXECUTION_MODE}" + (" (без ограничения времени)" if EXECUTION_MODE == 'inprocess' else "") + (f", отдельным процессом: {', '.join(sorted(SUBPROCESS_JOBS))}" if SUBPROCESS_JOBS else ""))
         print("Логи в папке: logs/")
         print("Для остановки: Ctrl+C или команда 'stop'")
         print("-" * 50)
@@ -203,6 +547,9 @@ def main():
     
     setup_signal_handlers()
     
+    # Импорты и инициализация делаются один раз при старте, а не при каждом запуске
+    load_entry_points()
+    
     input_thread = threading.Thread(target=user_input_listener, daemon=True)
     input_thread.start()
     
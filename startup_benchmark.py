@@ -0,0 +1,165 @@
+# Замер времени холодного старта запускаемых по расписанию скриптов (python -X importtime)
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Модули, которые планировщик запускает отдельным процессом (и сам планировщик)
+ENTRY_MODULES = ["main", "lottery_parser", "tab_to_re", "schedule_restart"]
+# Бюджет времени импорта (мс) для запуска без --baseline. Тяжелые зависимости (requests, psycopg2,
+# selenium) импортируются лениво; если одна из них попадет в импорт при старте, бюджет будет превышен
+IMPORT_BUDGETS_MS = {"main": 60, "lottery_parser": 80, "tab_to_re": 60, "schedule_restart": 300}
+# Сколько раз запускать каждый модуль (берется медиана)
+BENCHMARK_RUNS = int(os.getenv('STARTUP_BENCHMARK_RUNS', 5))
+# Допустимый рост времени импорта относительно сохраненного замера (0.25 = +25%)
+MAX_REGRESSION = float(os.getenv('STARTUP_MAX_REGRESSION', 0.25))
+# Рост меньше этого порога (мкс) не считается регрессией - шум измерения
+MIN_REGRESSION_US = 5000
+# Сколько самых тяжелых зависимостей показывать
+TOP_IMPORTS = 5
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(output):
+    """Разбирает вывод -X importtime: список (уровень вложенности, модуль, self мкс, cumulative мкс)"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Заголовок таблицы
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        level = (len(name) - len(stripped)) // 2
+        entries.append((level, stripped, int(parts[0]), int(parts[1])))
+    return entries
+
+
+def module_imports(entries, module):
+    """Время импорта модуля (мкс) и его прямые зависимости, отсортированные по времени"""
+    for index, (level, name, _, cumulative) in enumerate(entries):
+        if name != module:
+            continue
+        children = []
+        # Вложенные импорты печатаются перед самим модулем с большим отступом
+        for child_level, child_name, _, child_cumulative in reversed(entries[:index]):
+            if child_level <= level:
+                break
+            if child_level == level + 1:
+                children.append((child_name, child_cumulative))
+        children.sort(key=lambda child: child[1], reverse=True)
+        return cumulative, children
+    return None, []
+
+
+def measure(module, runs=BENCHMARK_RUNS):
+    """Запускает "import module" в новом процессе runs раз.
+
+    Возвращает словарь с медианой времени импорта и запуска процесса или None при ошибке.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="")
+    import_times = []
+    wall_times = []
+    children = []
+
+    # Первый запуск прогревает кэш байткода и файловой системы и в замер не входит
+    for run in range(runs + 1):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=SCRIPT_DIR, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            print(f"✗ Не удалось импортировать {module}:\n{result.stderr.strip()[-2000:]}")
+            return None
+        cumulative, run_children = module_imports(parse_importtime(result.stderr), module)
+        if cumulative is None:
+            print(f"✗ В выводе -X importtime нет модуля {module}")
+            return None
+        if run == 0:
+            continue
+        import_times.append(cumulative)
+        wall_times.append(elapsed * 1_000_000)
+        children = run_children
+
+    return {
+        'import_us': int(statistics.median(import_times)),
+        'process_us': int(statistics.median(wall_times)),
+        'top_imports': children[:TOP_IMPORTS]
+    }
+
+
+def load_baseline(path):
+    """Читает сохраненный замер {модуль: мкс}"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"✗ Не удалось прочитать замер {path}: {e}")
+        return None
+
+
+def main():
+    """Основная функция. Код возврата 1 - ошибка импорта, регрессия относительно замера
+    или (без --baseline) превышение бюджета IMPORT_BUDGETS_MS"""
+    arg_parser = argparse.ArgumentParser(description="Замер времени холодного старта скриптов")
+    arg_parser.add_argument('modules', nargs='*', default=ENTRY_MODULES,
+                            help="модули для замера (по умолчанию все точки входа)")
+    arg_parser.add_argument('--runs', type=int, default=BENCHMARK_RUNS,
+                            help="число запусков каждого модуля")
+    arg_parser.add_argument('--save', metavar='FILE',
+                            help="сохранить результат как замер для сравнения")
+    arg_parser.add_argument('--baseline', metavar='FILE',
+                            help="сравнить с сохраненным замером вместо бюджетов IMPORT_BUDGETS_MS")
+    arg_parser.add_argument('--max-regression', type=float, default=MAX_REGRESSION,
+                            help="допустимый рост времени импорта (доля, 0.25 = +25%%)")
+    args = arg_parser.parse_args()
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    if args.baseline and baseline is None:
+        return False
+
+    results = {}
+    success = True
+    for module in args.modules:
+        measurement = measure(module, args.runs)
+        if measurement is None:
+            success = False
+            continue
+        results[module] = measurement['import_us']
+
+        print(f"\n{module}: импорт {measurement['import_us'] / 1000:.1f} мс, "
+              f"запуск процесса {measurement['process_us'] / 1000:.1f} мс")
+        for name, cumulative in measurement['top_imports']:
+            print(f"    {name}: {cumulative / 1000:.1f} мс")
+
+        if baseline and module in baseline:
+            previous = baseline[module]
+            growth = measurement['import_us'] - previous
+            if growth > MIN_REGRESSION_US and growth > previous * args.max_regression:
+                print(f"✗ Регрессия: было {previous / 1000:.1f} мс, стало {measurement['import_us'] / 1000:.1f} мс")
+                success = False
+            else:
+                print(f"✓ В пределах замера ({previous / 1000:.1f} мс)")
+        elif not args.baseline and module in IMPORT_BUDGETS_MS:
+            budget_ms = IMPORT_BUDGETS_MS[module]
+            if measurement['import_us'] > budget_ms * 1000:
+                print(f"✗ Превышен бюджет: {measurement['import_us'] / 1000:.1f} мс при бюджете {budget_ms} мс")
+                success = False
+            else:
+                print(f"✓ В пределах бюджета ({budget_ms} мс)")
+
+    if args.save and results:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nЗамер сохранен в {args.save}")
+
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
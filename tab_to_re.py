@@ -1,119 +1,269 @@
-import psycopg2
+import argparse
+import sys
+from bisect import bisect_left
 from datetime import datetime, timedelta
 import os
-from dotenv import load_dotenv
-
-# Загружаем переменные из .env
-load_dotenv()
-
-# Конфигурация БД
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST'),
-    'port': os.getenv('DB_PORT'),
-    'database': os.getenv('DB_NAME'),
-    'user': os.getenv('DB_USER'),
-    'password': os.getenv('DB_PASSWORD')
-}
-
-def connect_db():
-    """Подключение к базе данных"""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except Exception as e:
-        print(f"Ошибка подключения к БД: {e}")
+from db import get_connection, use_connection  # Импорт db также загружает переменные из .env
+
+# Допуск по времени при сопоставлении тиража и наблюдения погоды
+MATCH_TOLERANCE = timedelta(minutes=10)
+
+# Город, с погодой которого сопоставляются тиражи (название как в data_weather, например "Москва").
+# Не задан - допустимо, только пока в data_weather один город
+MATCH_CITY = os.getenv('WEATHER_MATCH_CITY') or None
+
+# Размер пачки строк при вставке в total_results
+INSERT_BATCH_SIZE = int(os.getenv('INSERT_BATCH_SIZE', 1000))
+
+def find_closest_weather(draw_time, weather_times, weather_data):
+    """Ищет ближайшее по времени наблюдение погоды.
+
+    weather_times - отсортированный список времен наблюдений, weather_data - записи в том же порядке
+    (ORDER BY время_наблюдения, город, id). Возвращает (запись, разница) или (None, None), если данных погоды нет.
+    При равной разнице выигрывает более раннее наблюдение, при равном времени - первое
+    по (город, id), как в ORDER BY серверного режима.
+    """
+    if not weather_times:
+        return None, None
+    
+    pos = bisect_left(weather_times, draw_time)
+    best_index = None
+    best_diff = None
+    # Кандидаты: первое из наблюдений с последним временем до тиража
+    # и первое наблюдение в момент тиража или после него
+    candidates = [pos]
+    if pos > 0:
+        candidates.insert(0, bisect_left(weather_times, weather_times[pos - 1]))
+    for index in candidates:
+        if 0 <= index < len(weather_times):
+            time_diff = abs(draw_time - weather_times[index])
+            if best_diff is None or time_diff < best_diff:
+                best_index = index
+                best_diff = time_diff
+    
+    return weather_data[best_index], best_diff
+
+def check_match_city(cursor):
+    """Без WEATHER_MATCH_CITY сопоставлять можно, только если в data_weather один город.
+
+    Иначе тираж сопоставился бы с ближайшим наблюдением любого города (время которого - местное для этого города).
+    """
+    if MATCH_CITY is not None:
+        return True
+    cursor.execute('SELECT COUNT(*) FROM (SELECT DISTINCT "город" FROM data_weather) cities')
+    cities_count = cursor.fetchone()[0]
+    if cities_count > 1:
+        print(f"✗ В data_weather {cities_count} городов: укажите в .env WEATHER_MATCH_CITY (например, Москва)")
+        return False
+    return True
+
+def ensure_watermark_table(cursor):
+    """Создает таблицу с отметкой последнего сопоставления, если её нет"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS total_results_watermark (
+        "id" INTEGER PRIMARY KEY DEFAULT 1 CHECK ("id" = 1),
+        "последний_айди_тиража" INTEGER,
+        "последний_id_погоды" INTEGER,
+        "город" VARCHAR(100),
+        "обновлено" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def get_watermark(cursor):
+    """Возвращает (последний айди тиража, последний id наблюдения) прошлого сопоставления или None.
+
+    Отметка, сохраненная для другого WEATHER_MATCH_CITY, не подходит - нужна полная пересборка.
+    """
+    ensure_watermark_table(cursor)
+    cursor.execute('''
+    SELECT "последний_айди_тиража", "последний_id_погоды", "город"
+    FROM total_results_watermark WHERE "id" = 1
+    ''')
+    row = cursor.fetchone()
+    if row is None or row[0] is None or row[1] is None or row[2] != MATCH_CITY:
         return None
+    return row[0], row[1]
+
+def save_watermark(cursor):
+    """Запоминает последние по порядку вставки тираж и наблюдение (города MATCH_CITY), учтенные в total_results.
+
+    Порядок вставки (SERIAL), а не номер тиража или время наблюдения: тиражи из загрузки истории
+    и запоздавшие наблюдения имеют меньшие номера и времена, но большие id.
+    """
+    ensure_watermark_table(cursor)
+    cursor.execute('''
+    INSERT INTO total_results_watermark ("id", "последний_айди_тиража", "последний_id_погоды", "город", "обновлено")
+    SELECT 1, (SELECT COALESCE(MAX("айди"), 0) FROM lottery_4x20),
+              (SELECT COALESCE(MAX("id"), 0) FROM data_weather
+               WHERE %(city)s IS NULL OR "город" = %(city)s),
+              %(city)s,
+              CURRENT_TIMESTAMP
+    ON CONFLICT ("id") DO UPDATE SET
+        "последний_айди_тиража" = EXCLUDED."последний_айди_тиража",
+        "последний_id_погоды" = EXCLUDED."последний_id_погоды",
+        "город" = EXCLUDED."город",
+        "обновлено" = EXCLUDED."обновлено"
+    ''', {'city': MATCH_CITY})
+
+def draws_filter(watermark, table_alias=None):
+    """Условие WHERE для тиражей, которые нужно пересопоставить.
+
+    Тиражи, добавленные после отметки, плюс тиражи, в окно ±допуск которых попало
+    наблюдение, добавленное после отметки. Без отметки пересопоставляются все тиражи.
+    """
+    if watermark is None:
+        return "TRUE", {}
+    last_draw_id, last_weather_id = watermark
+    prefix = f"{table_alias or 'lottery_4x20'}."
+    return (f"""({prefix}"айди" > %(last_draw_id)s
+        OR EXISTS (
+            SELECT 1 FROM data_weather new_w
+            WHERE new_w."id" > %(last_weather_id)s
+              AND (%(city)s IS NULL OR new_w."город" = %(city)s)
+              AND new_w.время_наблюдения BETWEEN {prefix}дата_время_тиража - %(tolerance)s
+                                             AND {prefix}дата_время_тиража + %(tolerance)s
+        ))""",
+            {'last_draw_id': last_draw_id, 'last_weather_id': last_weather_id,
+             'city': MATCH_CITY, 'tolerance': MATCH_TOLERANCE})
 
-def compare_and_insert_data():
-    """Сравнивает данные лотереи и погоды, вставляет результаты в total_results"""
-    conn = connect_db()
-    if conn is None:
+def clear_total_results(cursor, watermark):
+    """Очищает total_results целиком или только строки пересопоставляемых тиражей"""
+    if watermark is None:
+        cursor.execute("TRUNCATE TABLE total_results RESTART IDENTITY")
+    else:
+        where_sql, params = draws_filter(watermark)
+        cursor.execute(f'''
+        DELETE FROM total_results
+        WHERE номер_тиража IN (SELECT номер_тиража FROM lottery_4x20 WHERE {where_sql})
+        ''', params)
+
+def flush_total_results(conn, rows, batch_size=INSERT_BATCH_SIZE):
+    """Вставляет накопленные строки в total_results пачками и очищает буфер"""
+    if not rows:
         return
     
+    # psycopg2 импортируется при первой вставке, а не при запуске скрипта
+    from psycopg2.extras import execute_values
+    
+    insert_query = '''
+    INSERT INTO total_results (
+        номер_тиража, дата_время_тиража, шар1, шар2, шар3, шар4, шар5, шар6, шар7, шар8,
+        время_наблюдения_погоды, температура, влажность, давление, ветер_скорость, 
+        ветер_направление, погодные_условия, разница_времени_минуты
+    ) VALUES %s
+    '''
+    with conn.cursor() as cursor:
+        execute_values(cursor, insert_query, rows, page_size=batch_size)
+    rows.clear()
+
+def compare_and_insert_data(server_side=False, full=False, batch_size=INSERT_BATCH_SIZE, conn=None):
+    """Сравнивает данные лотереи и погоды, вставляет результаты в total_results
+
+    server_side=True - сопоставление целиком на стороне PostgreSQL,
+    иначе данные загружаются и сопоставляются в Python.
+    По умолчанию обновление инкрементальное (от сохраненной отметки),
+    full=True - полная пересборка таблицы.
+    batch_size - сколько строк отправлять в БД одним запросом.
+    conn - готовое соединение без открытой транзакции (по умолчанию из общего пула).
+    """
+    if server_side:
+        return compare_and_insert_data_server(full=full, conn=conn)
+    
     try:
-        # Получаем данные лотереи
-        with conn.cursor() as cursor:
-            lottery_query = '''
-            SELECT номер_тиража, дата_время_тиража, шар1, шар2, шар3, шар4, шар5, шар6, шар7, шар8
-            FROM lottery_4x20 
-            ORDER BY дата_время_тиража
-            '''
-            cursor.execute(lottery_query)
-            lottery_data = []
-            for row in cursor.fetchall():
-                lottery_data.append({
-                    'номер_тиража': row[0],
-                    'дата_время_тиража': row[1],
-                    'шар1': row[2],
-                    'шар2': row[3],
-                    'шар3': row[4],
-                    'шар4': row[5],
-                    'шар5': row[6],
-                    'шар6': row[7],
-                    'шар7': row[8],
-                    'шар8': row[9]
-                })
+        with use_connection(conn) as conn:
+            # Все запросы видят один снимок данных, чтобы отметка совпадала с обработанными строками
+            with conn.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                if not check_match_city(cursor):
+                    # Соединение может быть передано вызывающим кодом - не оставляем транзакцию открытой
+                    conn.rollback()
+                    return False
+                watermark = None if full else get_watermark(cursor)
+            if watermark:
+                print(f"Инкрементальное обновление: после тиража с айди {watermark[0]}, наблюдения с id {watermark[1]}")
+            else:
+                print("Полная пересборка total_results")
+        
+            # Получаем данные лотереи
+            with conn.cursor() as cursor:
+                where_sql, params = draws_filter(watermark)
+                lottery_query = f'''
+                SELECT номер_тиража, дата_время_тиража, шар1, шар2, шар3, шар4, шар5, шар6, шар7, шар8
+                FROM lottery_4x20 
+                WHERE {where_sql}
+                ORDER BY дата_время_тиража
+                '''
+                cursor.execute(lottery_query, params)
+                lottery_data = []
+                for row in cursor.fetchall():
+                    lottery_data.append({
+                        'номер_тиража': row[0],
+                        'дата_время_тиража': row[1],
+                        'шар1': row[2],
+                        'шар2': row[3],
+                        'шар3': row[4],
+                        'шар4': row[5],
+                        'шар5': row[6],
+                        'шар6': row[7],
+                        'шар7': row[8],
+                        'шар8': row[9]
+                    })
             
-            print(f"Получено записей лотереи: {len(lottery_data)}")
+                print(f"Получено записей лотереи: {len(lottery_data)}")
         
-        # Получаем данные погоды с правильной структурой
-        with conn.cursor() as cursor:
-            weather_query = '''
-            SELECT время_наблюдения, температура, влажность, давление, скорость_ветра, 
-                   направление_ветра, тип_осадков
-            FROM data_weather 
-            ORDER BY время_наблюдения
-            '''
+            # Получаем данные погоды с правильной структурой
+            with conn.cursor() as cursor:
+                weather_query = '''
+                SELECT время_наблюдения, температура, влажность, давление, скорость_ветра, 
+                       направление_ветра, тип_осадков
+                FROM data_weather 
+                WHERE время_наблюдения BETWEEN %s AND %s
+                  AND (%s IS NULL OR город = %s)
+                ORDER BY время_наблюдения, город, id
+                '''
             
-            cursor.execute(weather_query)
-            weather_data = []
+                weather_data = []
+                # Нужны только наблюдения, попадающие в окна выбранных тиражей
+                if lottery_data:
+                    weather_from = lottery_data[0]['дата_время_тиража'] - MATCH_TOLERANCE
+                    weather_to = lottery_data[-1]['дата_время_тиража'] + MATCH_TOLERANCE
+                    cursor.execute(weather_query, (weather_from, weather_to, MATCH_CITY, MATCH_CITY))
+                    weather_rows = cursor.fetchall()
+                else:
+                    weather_rows = []
             
-            for row in cursor.fetchall():
-                weather_data.append({
-                    'время_наблюдения': row[0],
-                    'температура': row[1],
-                    'влажность': row[2],
-                    'давление': row[3],
-                    'ветер_скорость': row[4],  # скорость_ветра -> ветер_скорость
-                    'ветер_направление': row[5],  # направление_ветра -> ветер_направление
-                    'погодные_условия': row[6]  # тип_осадков -> погодные_условия
-                })
+                for row in weather_rows:
+                    weather_data.append({
+                        'время_наблюдения': row[0],
+                        'температура': row[1],
+                        'влажность': row[2],
+                        'давление': row[3],
+                        'ветер_скорость': row[4],  # скорость_ветра -> ветер_скорость
+                        'ветер_направление': row[5],  # направление_ветра -> ветер_направление
+                        'погодные_условия': row[6]  # тип_осадков -> погодные_условия
+                    })
             
-            print(f"Получено записей погоды: {len(weather_data)}")
+                print(f"Получено записей погоды: {len(weather_data)}")
+        
+            # Очищаем таблицу (или строки пересопоставляемых тиражей) перед заполнением
+            with conn.cursor() as cursor:
+                clear_total_results(cursor, watermark)
         
-        # Очищаем таблицу перед заполнением
-        with conn.cursor() as cursor:
-            cursor.execute("TRUNCATE TABLE total_results RESTART IDENTITY")
+            # Сравниваем данные и вставляем результаты
+            matched_count = 0
+            unmatched_count = 0
         
-        # Сравниваем данные и вставляем результаты
-        matched_count = 0
-        unmatched_count = 0
+            # Времена наблюдений уже отсортированы (ORDER BY), ищем ближайшее бинарным поиском
+            weather_times = [weather['время_наблюдения'] for weather in weather_data]
+            insert_buffer = []
         
-        for lottery in lottery_data:
-            closest_weather = None
-            min_time_diff = timedelta(minutes=10 + 1)  # Допуск ±10 минут
+            for lottery in lottery_data:
+                closest_weather, time_diff = find_closest_weather(lottery['дата_время_тиража'], weather_times, weather_data)
             
-            for weather in weather_data:
-                weather_time = weather['время_наблюдения']
-                time_diff = abs(lottery['дата_время_тиража'] - weather_time)
-                
-                # Ищем данные в пределах 10 минут
-                if time_diff <= timedelta(minutes=10) and time_diff < min_time_diff:
-                    min_time_diff = time_diff
-                    closest_weather = weather
+                if closest_weather and time_diff <= MATCH_TOLERANCE:
                     closest_weather['разница_времени_минуты'] = int(time_diff.total_seconds() / 60)
-            
-            if closest_weather:
-                # Вставляем совпавшие данные
-                with conn.cursor() as cursor:
-                    insert_query = '''
-                    INSERT INTO total_results (
-                        номер_тиража, дата_время_тиража, шар1, шар2, шар3, шар4, шар5, шар6, шар7, шар8,
-                        время_наблюдения_погоды, температура, влажность, давление, ветер_скорость, 
-                        ветер_направление, погодные_условия, разница_времени_минуты
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    '''
-                    cursor.execute(insert_query, (
+                    # Копим совпавшие данные и вставляем пачками
+                    insert_buffer.append((
                         lottery['номер_тиража'],
                         lottery['дата_время_тиража'],
                         lottery['шар1'],
@@ -133,78 +283,207 @@ def compare_and_insert_data():
                         closest_weather['погодные_условия'],
                         closest_weather['разница_времени_минуты']
                     ))
-                matched_count += 1
-                print(f"✓ Сопоставлен тираж {lottery['номер_тиража']} ({lottery['дата_время_тиража']})")
-                print(f"  с погодой от {closest_weather['время_наблюдения']} (разница: {closest_weather['разница_времени_минуты']} мин)")
-            else:
-                unmatched_count += 1
-                # Показываем ближайшие доступные данные погоды для отладки
-                closest_times = []
-                for weather in weather_data:
-                    time_diff = abs(lottery['дата_время_тиража'] - weather['время_наблюдения'])
-                    closest_times.append((time_diff, weather['время_наблюдения']))
-                
-                closest_times.sort()
-                if closest_times:
-                    best_diff = int(closest_times[0][0].total_seconds() / 60)
-                    print(f"✗ Тираж {lottery['номер_тиража']} ({lottery['дата_время_тиража']})")
-                    print(f"  Ближайшая погода: {closest_times[0][1]} (разница: {best_diff} мин)")
+                    if len(insert_buffer) >= batch_size:
+                        flush_total_results(conn, insert_buffer, batch_size)
+                    matched_count += 1
+                    print(f"✓ Сопоставлен тираж {lottery['номер_тиража']} ({lottery['дата_время_тиража']})")
+                    print(f"  с погодой от {closest_weather['время_наблюдения']} (разница: {closest_weather['разница_времени_минуты']} мин)")
                 else:
-                    print(f"✗ Тираж {lottery['номер_тиража']} ({lottery['дата_время_тиража']}) - нет данных погоды")
+                    unmatched_count += 1
+                    # Показываем ближайшие доступные данные погоды для отладки (уже найдены выше)
+                    if closest_weather:
+                        best_diff = int(time_diff.total_seconds() / 60)
+                        print(f"✗ Тираж {lottery['номер_тиража']} ({lottery['дата_время_тиража']})")
+                        print(f"  Ближайшая погода: {closest_weather['время_наблюдения']} (разница: {best_diff} мин)")
+                    else:
+                        print(f"✗ Тираж {lottery['номер_тиража']} ({lottery['дата_время_тиража']}) - нет данных погоды")
         
-        conn.commit()
+            flush_total_results(conn, insert_buffer, batch_size)
         
-        print(f"\n=== Результаты сопоставления ===")
-        print(f"Успешно сопоставлено: {matched_count}")
-        print(f"Не найдено погоды: {unmatched_count}")
-        print(f"Всего обработано: {len(lottery_data)}")
+            with conn.cursor() as cursor:
+                save_watermark(cursor)
+            conn.commit()
+        
+            print(f"\n=== Результаты сопоставления ===")
+            print(f"Успешно сопоставлено: {matched_count}")
+            print(f"Не найдено погоды: {unmatched_count}")
+            print(f"Всего обработано: {len(lottery_data)}")
+            return True
         
     except Exception as e:
         print(f"✗ Ошибка при сравнении данных: {e}")
-        conn.rollback()
-    finally:
-        if conn:
-            conn.close()
+        return False
 
-def show_total_results():
-    """Показывает содержимое таблицы total_results"""
-    conn = connect_db()
-    if conn is None:
-        return
-    
+def compare_and_insert_data_server(full=False, conn=None):
+    """Сопоставляет тиражи и погоду одним INSERT ... SELECT на стороне PostgreSQL"""
     try:
-        with conn.cursor() as cursor:
-            cursor.execute('SELECT COUNT(*) FROM total_results')
-            total_count = cursor.fetchone()[0]
+        with use_connection(conn) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                if not check_match_city(cursor):
+                    # Соединение может быть передано вызывающим кодом - не оставляем транзакцию открытой
+                    conn.rollback()
+                    return False
+                watermark = None if full else get_watermark(cursor)
+                if watermark:
+                    print(f"Инкрементальное обновление: после тиража с айди {watermark[0]}, наблюдения с id {watermark[1]}")
+                else:
+                    print("Полная пересборка total_results")
+            
+                clear_total_results(cursor, watermark)
+                where_sql, params = draws_filter(watermark, table_alias='l')
+                params['tolerance'] = MATCH_TOLERANCE
+                params['city'] = MATCH_CITY
+            
+                # Для каждого тиража берем ближайшее наблюдение в окне допуска.
+                # Условие по диапазону использует индекс "data_weather_время_idx" (или ("город", "время_наблюдения")
+                # при заданном городе). При равной разнице выигрывает более раннее наблюдение,
+                # при равном времени - первое по (город, id), как в Python режиме
+                insert_query = f'''
+                INSERT INTO total_results (
+                    номер_тиража, дата_время_тиража, шар1, шар2, шар3, шар4, шар5, шар6, шар7, шар8,
+                    время_наблюдения_погоды, температура, влажность, давление, ветер_скорость, 
+                    ветер_направление, погодные_условия, разница_времени_минуты
+                )
+                SELECT l.номер_тиража, l.дата_время_тиража, l.шар1, l.шар2, l.шар3, l.шар4,
+                       l.шар5, l.шар6, l.шар7, l.шар8,
+                       w.время_наблюдения, w.температура, w.влажность, w.давление, w.скорость_ветра,
+                       w.направление_ветра, w.тип_осадков,
+                       floor(abs(extract(epoch from (l.дата_время_тиража - w.время_наблюдения))) / 60)::int
+                FROM lottery_4x20 l
+                LEFT JOIN LATERAL (
+                    SELECT время_наблюдения, температура, влажность, давление, скорость_ветра,
+                           направление_ветра, тип_осадков
+                    FROM data_weather
+                    WHERE время_наблюдения BETWEEN l.дата_время_тиража - %(tolerance)s
+                                               AND l.дата_время_тиража + %(tolerance)s
+                      AND (%(city)s IS NULL OR город = %(city)s)
+                    ORDER BY abs(extract(epoch from (l.дата_время_тиража - время_наблюдения))),
+                             время_наблюдения, город, id
+                    LIMIT 1
+                ) w ON true
+                WHERE w.время_наблюдения IS NOT NULL AND {where_sql}
+                ORDER BY l.дата_время_тиража
+                '''
+                cursor.execute(insert_query, params)
+                matched_count = cursor.rowcount
+            
+                cursor.execute(f'SELECT COUNT(*) FROM lottery_4x20 l WHERE {where_sql}', params)
+                total_count = cursor.fetchone()[0]
             
-            if total_count > 0:
-                print(f"\n=== Содержимое total_results ({total_count} записей) ===")
+                save_watermark(cursor)
+        
+            conn.commit()
+        
+            print(f"\n=== Результаты сопоставления (на стороне БД) ===")
+            print(f"Успешно сопоставлено: {matched_count}")
+            print(f"Не найдено погоды: {total_count - matched_count}")
+            print(f"Всего обработано: {total_count}")
+            return True
+        
+    except Exception as e:
+        print(f"✗ Ошибка при сравнении данных на стороне БД: {e}")
+        return False
+
+def fetch_total_results():
+    """Возвращает содержимое total_results без служебного id, упорядоченное по номеру тиража"""
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
                 cursor.execute('''
-                SELECT номер_тиража, дата_время_тиража, время_наблюдения_погоды, 
-                       температура, разница_времени_минуты
+                SELECT номер_тиража, дата_время_тиража, шар1, шар2, шар3, шар4, шар5, шар6, шар7, шар8,
+                       время_наблюдения_погоды, температура, влажность, давление, ветер_скорость, 
+                       ветер_направление, погодные_условия, разница_времени_минуты
                 FROM total_results 
                 ORDER BY номер_тиража
                 ''')
-                records = cursor.fetchall()
+                return cursor.fetchall()
+    except Exception as e:
+        print(f"Ошибка при получении данных: {e}")
+        return None
+
+def check_modes_match():
+    """Проверяет, что Python и серверный режимы дают одинаковый total_results"""
+    print("=== Проверка совпадения режимов сопоставления ===")
+    
+    if not compare_and_insert_data(server_side=False, full=True):
+        return False
+    python_rows = fetch_total_results()
+    
+    if not compare_and_insert_data(server_side=True, full=True):
+        return False
+    server_rows = fetch_total_results()
+    
+    if python_rows is None or server_rows is None:
+        return False
+    
+    if python_rows == server_rows:
+        print(f"✓ Режимы совпадают ({len(server_rows)} записей)")
+        return True
+    
+    python_by_draw = {row[0]: row for row in python_rows}
+    server_by_draw = {row[0]: row for row in server_rows}
+    for draw_number in sorted(set(python_by_draw) | set(server_by_draw)):
+        if python_by_draw.get(draw_number) != server_by_draw.get(draw_number):
+            print(f"✗ Тираж {draw_number}:")
+            print(f"  Python: {python_by_draw.get(draw_number)}")
+            print(f"  БД:     {server_by_draw.get(draw_number)}")
+    print(f"✗ Режимы различаются (Python: {len(python_rows)}, БД: {len(server_rows)})")
+    return False
+
+def show_total_results():
+    """Показывает содержимое таблицы total_results"""
+    try:
+        with get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM total_results')
+                total_count = cursor.fetchone()[0]
+            
+                if total_count > 0:
+                    print(f"\n=== Содержимое total_results ({total_count} записей) ===")
+                    cursor.execute('''
+                    SELECT номер_тиража, дата_время_тиража, время_наблюдения_погоды, 
+                           температура, разница_времени_минуты
+                    FROM total_results 
+                    ORDER BY номер_тиража
+                    ''')
+                    records = cursor.fetchall()
                 
-                for record in records:
-                    print(f"Тираж {record[0]}: лотерея {record[1]}, погода {record[2]}, темп: {record[3]}°C, разница: {record[4]} мин")
-            else:
-                print("\nТаблица total_results пуста")
+                    for record in records:
+                        print(f"Тираж {record[0]}: лотерея {record[1]}, погода {record[2]}, темп: {record[3]}°C, разница: {record[4]} мин")
+                else:
+                    print("\nТаблица total_results пуста")
                 
     except Exception as e:
         print(f"Ошибка при получении данных: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-def main():
-    """Основная функция"""
+def rebuild_results(server_side=False, full=False, batch_size=INSERT_BATCH_SIZE, conn=None):
+    """Обновляет total_results (точка входа для планировщика и других модулей).
+
+    Параметры как у compare_and_insert_data. Возвращает True при успехе.
+    """
     print("=== Сравнение данных лотереи и погоды ===")
     print("Настройка: допуск по времени ±10 минут")
+    return compare_and_insert_data(server_side=server_side, full=full, batch_size=batch_size, conn=conn)
+
+def main():
+    """Основная функция"""
+    arg_parser = argparse.ArgumentParser(description="Сравнение данных лотереи и погоды")
+    arg_parser.add_argument('--server', action='store_true',
+                            help="сопоставлять на стороне PostgreSQL одним запросом")
+    arg_parser.add_argument('--full', action='store_true',
+                            help="полностью пересобрать total_results вместо инкрементального обновления")
+    arg_parser.add_argument('--batch-size', type=int, default=INSERT_BATCH_SIZE,
+                            help="размер пачки строк при вставке в total_results")
+    arg_parser.add_argument('--check', action='store_true',
+                            help="проверить, что Python и серверный режимы дают одинаковый результат")
+    args = arg_parser.parse_args()
+    
+    if args.check:
+        sys.exit(0 if check_modes_match() else 1)
     
     # Сравниваем и вставляем данные
-    compare_and_insert_data()
+    rebuild_results(server_side=args.server, full=args.full, batch_size=args.batch_size)
     
     # Показываем результаты
     show_total_results()
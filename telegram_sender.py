@@ -0,0 +1,184 @@
+# Отправка сообщений в Telegram Bot API с учетом лимитов: общая сессия, темп по токенам, повтор после 429
+import os
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Корень Bot API (можно указать локальную заглушку для проверки без сети)
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', "https://api.telegram.org")
+# Лимиты Telegram: около 30 сообщений в секунду на бота и 1 сообщение в секунду в один чат
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+# Сколько раз повторять запрос после 429, ошибки сервера или сети
+TELEGRAM_RETRIES = int(os.getenv('TELEGRAM_RETRIES', 5))
+# База экспоненциальной паузы при ошибках сервера и сети (сек)
+TELEGRAM_BACKOFF = float(os.getenv('TELEGRAM_BACKOFF', 1))
+# Самая долгая пауза по retry_after, которую стоит ждать (сек); при большей паузе отправка прекращается,
+# потому что повтор раньше срока только продлит ограничение Telegram
+TELEGRAM_MAX_RETRY_AFTER = float(os.getenv('TELEGRAM_MAX_RETRY_AFTER', 60))
+# Таймаут одного запроса (сек)
+TELEGRAM_TIMEOUT = 30
+# Максимум одновременных соединений с Bot API
+TELEGRAM_POOL_SIZE = 10
+
+
+class TokenBucket:
+    """Ограничение темпа: rate разрешений в секунду, запас до capacity.
+
+    Разрешение резервируется сразу, а ожидание идет вне блокировки, поэтому
+    потоки обслуживаются по очереди обращения.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Резервирует одно разрешение и возвращает, сколько секунд его ждать"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        """Ждет разрешения на отправку"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class TelegramSender:
+    """Клиент Bot API для отправки сообщений и файлов.
+
+    Соединения переиспользуются (одна сессия на объект), темп ограничивается
+    общим лимитом бота и лимитом каждого чата. На 429 запрос повторяется после
+    паузы из parameters.retry_after. Части одного сообщения уходят строго по порядку.
+    """
+
+    def __init__(self, bot_token, api_url=TELEGRAM_API_URL, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE, retries=TELEGRAM_RETRIES):
+        self.base_url = f"{api_url}/bot{bot_token}/"
+        self.chat_rate = chat_rate
+        self.retries = retries
+        self.global_bucket = TokenBucket(global_rate, capacity=max(1, int(global_rate)))
+        self.chat_buckets = {}
+        self.chat_buckets_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Счетчики для статистики
+        self.sent = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    def chat_bucket(self, chat_id):
+        """Ограничитель темпа для чата (создается при первой отправке)"""
+        with self.chat_buckets_lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self.chat_rate)
+                self.chat_buckets[chat_id] = bucket
+            return bucket
+
+    def call(self, method, chat_id, payload=None, files=None):
+        """Вызов метода Bot API с ограничением темпа и повторами. Возвращает True при успехе"""
+        url = self.base_url + method
+        data = dict(payload or {}, chat_id=chat_id)
+
+        for attempt in range(self.retries + 1):
+            self.chat_bucket(chat_id).acquire()
+            self.global_bucket.acquire()
+
+            # Файл при повторе отправляется с начала
+            if files:
+                for _, fileobj, *_ in files.values():
+                    fileobj.seek(0)
+
+            try:
+                if files:
+                    response = self.session.post(url, data=data, files=files, timeout=TELEGRAM_TIMEOUT)
+                else:
+                    response = self.session.post(url, json=data, timeout=TELEGRAM_TIMEOUT)
+            except requests.RequestException as e:
+                wait = self.backoff(attempt)
+                logger.warning(f"{method}: ошибка сети ({e}), повтор через {wait:.1f} сек")
+                time.sleep(wait)
+                continue
+
+            if response.status_code == 200:
+                self.sent += 1
+                return True
+
+            if response.status_code == 429:
+                self.rate_limited += 1
+                wait = self.retry_after(response)
+                if wait > TELEGRAM_MAX_RETRY_AFTER:
+                    logger.error(f"{method}: Telegram ограничил чат {chat_id} на {wait:g} сек "
+                                 f"(больше {TELEGRAM_MAX_RETRY_AFTER:g} сек), отправка прекращена")
+                    break
+                logger.warning(f"{method}: превышен лимит Telegram для чата {chat_id}, повтор через {wait} сек")
+                time.sleep(wait)
+                continue
+
+            if response.status_code >= 500:
+                wait = self.backoff(attempt)
+                logger.warning(f"{method}: ошибка сервера {response.status_code}, повтор через {wait:.1f} сек")
+                time.sleep(wait)
+                continue
+
+            # Ошибки 4xx (неверный чат, разметка, токен) повтором не исправить
+            logger.error(f"{method}: ошибка {response.status_code}: {response.text}")
+            break
+
+        self.failed += 1
+        return False
+
+    def retry_after(self, response):
+        """Пауза из ответа 429 (parameters.retry_after или заголовок Retry-After), сек"""
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            return float(response.headers.get('Retry-After', 1))
+
+    def backoff(self, attempt):
+        """Экспоненциальная пауза с разбросом перед повтором после ошибки сервера или сети"""
+        delay = TELEGRAM_BACKOFF * 2 ** attempt
+        return random.uniform(delay / 2, delay)
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        """Отправляет текстовое сообщение"""
+        payload = {'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        return self.call("sendMessage", chat_id, payload)
+
+    def send_messages(self, chat_id, texts, parse_mode=None):
+        """Отправляет сообщения по порядку; после неудачи остальные не отправляются,
+        чтобы получатель не увидел части вразнобой. Возвращает число отправленных"""
+        for index, text in enumerate(texts):
+            if not self.send_message(chat_id, text, parse_mode):
+                logger.error(f"Не отправлены части {index + 1}-{len(texts)} из {len(texts)} в чат {chat_id}")
+                return index
+        return len(texts)
+
+    def send_document(self, chat_id, filename, fileobj, content_type=None):
+        """Отправляет файл (объект файла читается с начала при каждой попытке)"""
+        files = {'document': (filename, fileobj, content_type)}
+        return self.call("sendDocument", chat_id, files=files)
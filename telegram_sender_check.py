@@ -0,0 +1,119 @@
+# Проверка TelegramSender на локальной заглушке Bot API: повтор после 429, порядок частей, темп по чату
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Чаты и число частей сообщения в каждом
+CHECK_CHATS = ["chat_a", "chat_b"]
+CHECK_PARTS = 4
+# Темп отправки в один чат в проверке (сообщений в секунду) - чаще, чем у Telegram, чтобы проверка шла быстро
+CHECK_CHAT_RATE = 4
+# Пауза, которую заглушка передает в ответе 429 (сек)
+STUB_RETRY_AFTER = 1
+# Допуск на точность таймеров при проверке пауз (сек)
+TIMING_TOLERANCE = 0.05
+
+# Принятые заглушкой сообщения: (время, чат, текст) и время ответа 429
+stub_messages = []
+stub_rate_limited = []
+stub_lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Заглушка Bot API: sendMessage; вторая попытка отправки в первый чат получает 429 с retry_after"""
+
+    attempts = {}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        chat_id = body['chat_id']
+        with stub_lock:
+            attempt = self.attempts[chat_id] = self.attempts.get(chat_id, 0) + 1
+            if chat_id == CHECK_CHATS[0] and attempt == 2:
+                stub_rate_limited.append(time.monotonic())
+                self.reply(429, {'ok': False, 'error_code': 429,
+                                 'parameters': {'retry_after': STUB_RETRY_AFTER}})
+                return
+            stub_messages.append((time.monotonic(), chat_id, body['text']))
+        self.reply(200, {'ok': True, 'result': {}})
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    """Основная функция. Код возврата 1 - части пришли не по порядку, повтор после 429 или темп нарушены"""
+    arg_parser = argparse.ArgumentParser(description="Проверка TelegramSender на локальной заглушке Bot API")
+    arg_parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Настройки читаются при импорте telegram_sender, поэтому задаются до него
+    os.environ['TELEGRAM_API_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ['TELEGRAM_CHAT_RATE'] = str(CHECK_CHAT_RATE)
+    from telegram_sender import TelegramSender
+
+    sender = TelegramSender('check')
+    parts = {chat_id: [f"{chat_id} часть {i}/{CHECK_PARTS}" for i in range(1, CHECK_PARTS + 1)]
+             for chat_id in CHECK_CHATS}
+    sent = {}
+
+    def send(chat_id):
+        sent[chat_id] = sender.send_messages(chat_id, parts[chat_id])
+
+    # Чаты отправляются параллельно, как при рассылке в несколько чатов
+    threads = [threading.Thread(target=send, args=(chat_id,)) for chat_id in CHECK_CHATS]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    success = True
+    for chat_id in CHECK_CHATS:
+        received = [(moment, text) for moment, chat, text in stub_messages if chat == chat_id]
+        if sent.get(chat_id) != CHECK_PARTS or [text for _, text in received] != parts[chat_id]:
+            print(f"✗ {chat_id}: отправлено {sent.get(chat_id)}, получено {[text for _, text in received]}")
+            success = False
+            continue
+        gaps = [later[0] - earlier[0] for earlier, later in zip(received, received[1:])]
+        if min(gaps) < 1 / CHECK_CHAT_RATE - TIMING_TOLERANCE:
+            print(f"✗ {chat_id}: интервал между сообщениями {min(gaps):.3f} сек, "
+                  f"лимит {1 / CHECK_CHAT_RATE:.3f} сек")
+            success = False
+            continue
+        print(f"✓ {chat_id}: {CHECK_PARTS} частей по порядку, минимальный интервал {min(gaps):.3f} сек")
+
+    if len(stub_rate_limited) != 1 or sender.rate_limited != 1:
+        print(f"✗ Ответов 429: заглушка {len(stub_rate_limited)}, отправитель {sender.rate_limited}, ожидался 1")
+        success = False
+    else:
+        retried = [moment for moment, chat, _ in stub_messages if chat == CHECK_CHATS[0]][1]
+        waited = retried - stub_rate_limited[0]
+        if waited < STUB_RETRY_AFTER - TIMING_TOLERANCE:
+            print(f"✗ Повтор после 429 через {waited:.3f} сек, retry_after {STUB_RETRY_AFTER} сек")
+            success = False
+        else:
+            print(f"✓ Повтор после 429 через {waited:.3f} сек (retry_after {STUB_RETRY_AFTER} сек)")
+
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,17 +1,83 @@
 import os  # Импорт модуля для работы с операционной системой
 from dotenv import load_dotenv  # Импорт функции для загрузки переменных из .env файла
 import requests  # Импорт библиотеки для выполнения HTTP-запросов
+from requests.adapters import HTTPAdapter  # Адаптер с пулом соединений
+from urllib3.util.retry import Retry  # Политика повторов запросов
 import time  # Импорт модуля для работы со временем (паузы)
-from datetime import datetime  # Импорт класса для работы с датой и временем
+from datetime import datetime, timedelta, timezone  # Импорт классов для работы с датой и временем
+from concurrent.futures import ThreadPoolExecutor  # Пул потоков для параллельных запросов
+import contextvars  # Контекст вызывающего потока для потоков пула
+import threading  # Отдельная HTTP сессия на поток
+from collections import deque  # Очередь ограниченной длины для статистики запросов
+from weather_cache import WeatherCache, WEATHER_CACHE_TTL  # Кэш ответов API
 
 # Загружаем переменные из .env файла
 load_dotenv()  # Загружает все переменные из файла .env в окружение
 
+# Максимум одновременных запросов при загрузке погоды для нескольких городов
+WEATHER_MAX_WORKERS = int(os.getenv('WEATHER_MAX_WORKERS', 8))
+# Корень API (можно указать локальную заглушку для проверки без сети)
+OPENWEATHER_BASE_URL = os.getenv('OPENWEATHER_BASE_URL', "https://api.openweathermap.org/data/2.5")
+# Сколько городов OpenWeather принимает в одном запросе group
+GROUP_MAX_IDS = 20
+# Повторы при 429/5xx и сетевых ошибках: число попыток и база экспоненциальной паузы (сек)
+WEATHER_RETRIES = int(os.getenv('WEATHER_RETRIES', 3))
+WEATHER_BACKOFF = float(os.getenv('WEATHER_BACKOFF', 1))
+# Потолок паузы по заголовку Retry-After (сек): дольше запрос не ждет, иначе сервер может надолго остановить задачу
+WEATHER_MAX_RETRY_AFTER = float(os.getenv('WEATHER_MAX_RETRY_AFTER', 60))
+# Сколько последних запросов хранить для статистики (объект живет весь срок работы планировщика)
+STATS_WINDOW = 1000
+
+def map_with_context(executor, function, items):  # executor.map в контексте вызывающего потока
+    """Как executor.map, но function выполняется в копии контекста (contextvars) вызывающего потока.
+
+    Так вывод потоков пула идет туда же, куда вывод вызывающего потока
+    (например, в лог задачи, запущенной планировщиком внутри процесса).
+    """
+    context = contextvars.copy_context()  # Снимок контекста до запуска потоков
+    # Один контекст нельзя войти из нескольких потоков сразу - каждому вызову своя копия
+    return executor.map(lambda item: context.copy().run(function, item), items)
+
+class CappedRetry(Retry):  # Политика повторов с ограниченной паузой Retry-After
+    """Retry, у которого пауза из заголовка Retry-After не больше WEATHER_MAX_RETRY_AFTER секунд"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)  # Пауза, которую просит сервер (или None)
+        if retry_after is None:
+            return None
+        return min(retry_after, WEATHER_MAX_RETRY_AFTER)
+
 class WeatherAPI:  # Объявление класса для работы с API погоды
-    def __init__(self):  # Конструктор класса (вызывается при создании объекта)
+    def __init__(self, max_workers=WEATHER_MAX_WORKERS, cache=None):  # Конструктор класса (вызывается при создании объекта)
         # Берем API ключ из .env
         self.api_key = os.getenv('OPENWEATHER_API_KEY')  # Получаем API ключ из переменной окружения
-        self.base_url = "https://api.openweathermap.org/data/2.5/weather"  # Базовый URL API погоды
+        self.base_url = f"{OPENWEATHER_BASE_URL}/weather"  # Базовый URL API погоды
+        self.group_url = f"{OPENWEATHER_BASE_URL}/group"  # URL для нескольких городов за один запрос
+        self.max_workers = max_workers  # Ограничение параллельных запросов
+        
+        self.request_latencies = deque(maxlen=STATS_WINDOW)  # Время выполнения каждого запроса (сек), включая повторы
+        self.response_statuses = deque(maxlen=STATS_WINDOW)  # Итоговые HTTP статусы ответов (после повторов)
+        
+        # Кэш ответов по городу (по умолчанию из настроек .env, WEATHER_CACHE_TTL=0 - без кэша)
+        if cache is None and WEATHER_CACHE_TTL > 0:
+            cache = WeatherCache()
+        self.cache = cache
+        
+        # Повторы с экспоненциальной паузой и случайным разбросом, Retry-After сервера учитывается (с потолком)
+        retry = CappedRetry(
+            total=WEATHER_RETRIES,
+            backoff_factor=WEATHER_BACKOFF,
+            backoff_jitter=WEATHER_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False  # После исчерпания попыток возвращаем последний ответ
+        )
+        
+        # Сессия своя у каждого потока (requests.Session не потокобезопасна, как в lottery_parser),
+        # а адаптер с пулом соединений общий: соединения с API переиспользуются (keep-alive) всеми потоками
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+        self.local = threading.local()
         
         # Проверяем загрузку API ключа
         if not self.api_key:  # Если ключ не найден или пустой
@@ -25,40 +91,27 @@ class WeatherAPI:  # Объявление класса для работы с AP
             print("API ключ погоды не найден")  # Сообщение об ошибке
             return None  # Возвращаем None если ключа нет
         
+        cache_key = f"q:{city}"  # Ключ кэша для города
+        if self.cache:  # Свежий ответ в кэше - запрос не нужен
+            cached = self.cache.get(cache_key)
+            if cached:
+                print(f"Погода для города {city} взята из кэша")
+                return self.parse_weather_data(cached, city, unchanged=True)
+        
         try:  # Начало блока обработки исключений
             # Формируем URL запроса с параметрами
             url = f"{self.base_url}?q={city}&appid={self.api_key}&units=metric&lang=ru"
             
             print(f"Запрос к API погоды для города: {city}")  # Информация о запросе
             
-            response = requests.get(url, timeout=10)  # Выполняем GET-запрос с таймаутом 10 секунд
+            response = self.fetch(url)  # Выполняем GET-запрос (с повторами)
             
-            print(f"Статус ответа: {response.status_code}")  # Выводим статус HTTP-ответа
+            print(f"Статус ответа: {response.status_code} ({response.latency:.2f} сек)")  # Статус и время
             
             if response.status_code == 200:  # Если запрос успешен (статус 200 OK)
                 data = response.json()  # Парсим JSON-ответ в словарь Python
-                
-                # Проверяем структуру данных
-                if not all(key in data for key in ['main', 'weather', 'wind']):  # Проверяем наличие обязательных ключей
-                    print("Неверная структура данных API")  # Сообщение об ошибке структуры
-                    return None  # Возвращаем None при неверной структуре
-                
-                # Создаем словарь с погодными данными
-                weather_info = {
-                    'temperature': data['main']['temp'],  # Температура
-                    'pressure': self.pa_to_mmhg(data['main']['pressure']),  # Давление (конвертированное)
-                    'humidity': data['main']['humidity'],  # Влажность
-                    'wind_speed': data['wind'].get('speed', 0),  # Скорость ветра (значение по умолчанию 0)
-                    'wind_direction': self.get_wind_direction(data['wind'].get('deg')),  # Направление ветра
-                    'description': data['weather'][0]['description'],  # Текстовое описание погоды
-                    'precipitation': self.get_precipitation_type(data),  # Тип осадков
-                    'observation_time': datetime.now(),  # Время получения данных
-                    'city': data.get('name', city)  # Название города (из ответа или переданное)
-                }
-                
-                # Вывод данных в консоль
-                self.print_weather_info(weather_info)  # Вызываем метод для красивого вывода
-                return weather_info  # Возвращаем словарь с погодными данными
+                unchanged = self.cache.put(cache_key, data) if self.cache else False  # Тот же dt - наблюдение не обновилось
+                return self.parse_weather_data(data, city, unchanged)  # Разбираем ответ в словарь с погодными данными
             else:  # Если HTTP-статус не 200
                 print(f"Ошибка API: {response.status_code}")  # Выводим код ошибки
                 if response.status_code == 401:  # Если ошибка авторизации
@@ -76,6 +129,138 @@ class WeatherAPI:  # Объявление класса для работы с AP
             print(f"Неожиданная ошибка: {e}")  # Выводим сообщение об ошибке
             return None  # Возвращаем None
 
+    def fetch(self, url):  # Метод выполнения запроса
+        """GET-запрос через общую сессию с замером времени (таймаут 10 секунд на попытку)"""
+        started = time.perf_counter()  # Засекаем время
+        try:
+            response = self.get_session().get(url, timeout=10)
+        finally:
+            latency = time.perf_counter() - started
+            self.request_latencies.append(latency)  # Сохраняем время запроса
+        response.latency = latency  # Время именно этого запроса (для вывода)
+        self.response_statuses.append(response.status_code)  # Статус для классификации ошибок
+        return response
+
+    def get_session(self):  # HTTP сессия текущего потока
+        """HTTP сессия с keep-alive, одна на поток, с общим адаптером и политикой повторов"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
+            self.local.session = session
+        return session
+
+    def reset_stats(self):  # Метод сброса статистики
+        """Сбрасывает статистику запросов и кэша перед новым запуском сбора"""
+        self.request_latencies.clear()
+        self.response_statuses.clear()
+        if self.cache:
+            self.cache.reset_stats()
+
+    def latency_stats(self):  # Метод статистики задержек
+        """Количество запросов, среднее и максимальное время запроса (сек)"""
+        latencies = list(self.request_latencies)
+        if not latencies:
+            return {'count': 0, 'avg': 0.0, 'max': 0.0}
+        return {'count': len(latencies), 'avg': sum(latencies) / len(latencies), 'max': max(latencies)}
+
+    def parse_weather_data(self, data, city, unchanged=False):  # Метод разбора ответа API
+        """Преобразование ответа API (одного города) в словарь с погодными данными
+
+        unchanged=True - наблюдение уже получалось раньше (из кэша или с тем же dt).
+        """
+        # Проверяем структуру данных
+        if not all(key in data for key in ['main', 'weather', 'wind']):  # Проверяем наличие обязательных ключей
+            print("Неверная структура данных API")  # Сообщение об ошибке структуры
+            return None  # Возвращаем None при неверной структуре
+        
+        # Создаем словарь с погодными данными
+        weather_info = {
+            'temperature': data['main']['temp'],  # Температура
+            'pressure': self.pa_to_mmhg(data['main']['pressure']),  # Давление (конвертированное)
+            'humidity': data['main']['humidity'],  # Влажность
+            'wind_speed': data['wind'].get('speed', 0),  # Скорость ветра (значение по умолчанию 0)
+            'wind_direction': self.get_wind_direction(data['wind'].get('deg')),  # Направление ветра
+            'description': data['weather'][0]['description'],  # Текстовое описание погоды
+            'precipitation': self.get_precipitation_type(data),  # Тип осадков
+            'observation_time': self.get_observation_time(data),  # Время наблюдения по данным провайдера
+            'city': data.get('name', city),  # Название города (из ответа или переданное)
+            'unchanged': unchanged  # Наблюдение уже получалось раньше (только для статистики, сохраняется как обычно)
+        }
+        
+        # Вывод данных в консоль
+        self.print_weather_info(weather_info)  # Вызываем метод для красивого вывода
+        return weather_info  # Возвращаем словарь с погодными данными
+
+    def get_data_weather_group(self, target_datetime, city_ids):  # Метод для городов по ID
+        """Получение погоды по списку ID городов через endpoint group (до 20 городов за запрос)"""
+        if not self.api_key:  # Проверяем наличие API ключа
+            print("API ключ погоды не найден")  # Сообщение об ошибке
+            return []  # Пустой список если ключа нет
+        
+        # Города со свежим ответом в кэше не запрашиваем
+        weather_list = []
+        missing_ids = []
+        for city_id in city_ids:
+            cached = self.cache.get(f"id:{city_id}") if self.cache else None
+            if cached:
+                print(f"Погода для города {city_id} взята из кэша")
+                weather_list.append(self.parse_weather_data(cached, city_id, unchanged=True))
+            else:
+                missing_ids.append(city_id)
+        
+        # Делим список на пачки по GROUP_MAX_IDS и загружаем пачки параллельно
+        chunks = [missing_ids[i:i + GROUP_MAX_IDS] for i in range(0, len(missing_ids), GROUP_MAX_IDS)]
+        if not chunks:  # Все города из кэша (или список пуст)
+            return [weather_info for weather_info in weather_list if weather_info]
+        
+        workers = min(self.max_workers, len(chunks))  # Не создаем лишних потоков
+        with ThreadPoolExecutor(max_workers=workers) as executor:  # Пул потоков
+            results = map_with_context(executor, self.get_data_weather_chunk, chunks)
+            weather_list.extend(weather_info for chunk_result in results for weather_info in chunk_result)
+        return [weather_info for weather_info in weather_list if weather_info]
+
+    def get_data_weather_chunk(self, city_ids):  # Один запрос group
+        """Один запрос group для пачки ID городов, возвращает список словарей с погодой"""
+        ids = ','.join(str(city_id) for city_id in city_ids)  # ID через запятую
+        try:  # Начало блока обработки исключений
+            url = f"{self.group_url}?id={ids}&appid={self.api_key}&units=metric&lang=ru"
+            
+            print(f"Запрос к API погоды для городов: {ids}")  # Информация о запросе
+            
+            response = self.fetch(url)  # Выполняем GET-запрос (с повторами)
+            
+            if response.status_code != 200:  # Если запрос неуспешен
+                print(f"Ошибка API: {response.status_code}")  # Выводим код ошибки
+                print(f"Ответ сервера: {response.text}")  # Выводим текст ответа сервера
+                return []  # Пустой список при ошибке
+            
+            weather_list = []  # Результаты по городам пачки
+            for data in response.json().get('list', []):  # Каждый элемент - как ответ /weather
+                unchanged = self.cache.put(f"id:{data.get('id')}", data) if self.cache else False
+                weather_info = self.parse_weather_data(data, data.get('id'), unchanged)  # Та же нормализация
+                if weather_info:  # Пропускаем элементы с неверной структурой
+                    weather_list.append(weather_info)
+            return weather_list  # Возвращаем список
+            
+        except requests.exceptions.RequestException as e:  # Обработка ошибок сети
+            print(f"Ошибка сети: {e}")  # Выводим сообщение об ошибке сети
+            return []  # Пустой список
+        except Exception as e:  # Обработка всех остальных исключений
+            print(f"Неожиданная ошибка: {e}")  # Выводим сообщение об ошибке
+            return []  # Пустой список
+
+    def get_data_weather_many(self, target_datetime, cities):  # Метод для нескольких городов
+        """Параллельное получение погоды для списка городов (не более max_workers запросов одновременно)"""
+        if not cities:  # Пустой список - делать нечего
+            return []
+        
+        workers = min(self.max_workers, len(cities))  # Не создаем лишних потоков
+        with ThreadPoolExecutor(max_workers=workers) as executor:  # Пул потоков
+            results = map_with_context(executor, lambda city: self.get_data_weather(target_datetime, city), cities)
+            return [weather_info for weather_info in results if weather_info]  # Отбрасываем неудачные запросы
+
     def print_weather_info(self, weather_info):  # Метод для вывода погодных данных
         """Красивый вывод погодных данных в консоль"""  # Строка документации
         print("Погода")  # Заголовок
@@ -88,6 +273,18 @@ class WeatherAPI:  # Объявление класса для работы с AP
         print(f"Описание: {weather_info['description']}")  # Описание погоды
         print(f"Осадки: {weather_info['precipitation']}")  # Тип осадков
 
+    def get_observation_time(self, weather_data):  # Метод определения времени наблюдения
+        """Время наблюдения из поля dt ответа (местное время города по смещению timezone)"""
+        dt = weather_data.get('dt')  # Unix-время наблюдения у провайдера
+        if dt is None:  # Если провайдер не прислал время
+            return datetime.now()  # Берем время получения данных
+        
+        # Смещение от UTC в секундах: у /weather в корне ответа, у group - в sys
+        offset = weather_data.get('timezone', weather_data.get('sys', {}).get('timezone'))
+        if offset is None:  # Смещение неизвестно - переводим в местное время сервера
+            return datetime.fromtimestamp(dt)
+        return datetime.fromtimestamp(dt, timezone.utc).replace(tzinfo=None) + timedelta(seconds=offset)
+
     def pa_to_mmhg(self, pressure_pa):  # Метод конвертации давления
         """Конвертация давления из Па в мм рт.ст."""  # Строка документации
         return round(pressure_pa * 0.750062)  # Возвращаем округленное значение после конвертации
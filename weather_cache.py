@@ -0,0 +1,95 @@
+# Кэш ответов API погоды: LRU в памяти с TTL и необязательное хранение на диске
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Время жизни записи (сек): OpenWeather обновляет наблюдения примерно раз в 10 минут; 0 - кэш выключен
+WEATHER_CACHE_TTL = int(os.getenv('WEATHER_CACHE_TTL', 600))
+# Максимум городов в памяти
+WEATHER_CACHE_SIZE = int(os.getenv('WEATHER_CACHE_SIZE', 256))
+# Файл для хранения кэша между запусками (пусто - только в памяти)
+WEATHER_CACHE_FILE = os.getenv('WEATHER_CACHE_FILE', '')
+
+
+class WeatherCache:
+    """Кэш сырых ответов API по ключу города.
+
+    Запись считается свежей WEATHER_CACHE_TTL секунд. Устаревшая запись не удаляется
+    сразу: по её полю dt можно понять, что новый ответ содержит то же наблюдение.
+    """
+
+    def __init__(self, ttl=WEATHER_CACHE_TTL, max_entries=WEATHER_CACHE_SIZE, path=WEATHER_CACHE_FILE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or None
+        self.entries = OrderedDict()  # ключ -> (время сохранения, ответ API)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.unchanged = 0  # Повторные запросы, вернувшие то же наблюдение (тот же dt)
+        self.load()
+
+    def load(self):
+        """Загружает кэш с диска, если задан файл"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)
+            for key, (stored_at, data) in stored.items():
+                self.entries[key] = (stored_at, data)
+        except (ValueError, OSError) as e:
+            print(f"Не удалось прочитать кэш погоды {self.path}: {e}")
+
+    def save(self):
+        """Атомарно записывает кэш на диск (вызывается под блокировкой)"""
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(self.entries), f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Не удалось сохранить кэш погоды {self.path}: {e}")
+
+    def get(self, key):
+        """Свежий ответ API для ключа или None (учитывается в статистике попаданий)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, data):
+        """Сохраняет ответ API. Возвращает True, если наблюдение не изменилось (тот же dt)"""
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            same_observation = (previous is not None and data.get('dt') is not None
+                                and previous[1].get('dt') == data.get('dt'))
+            if same_observation:
+                self.unchanged += 1
+            self.entries[key] = (time.time(), data)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.save()
+            return same_observation
+
+    def reset_stats(self):
+        """Обнуляет счетчики попаданий, промахов и повторных наблюдений"""
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.unchanged = 0
+
+    def stats(self):
+        """Счетчики попаданий, промахов и неизменившихся наблюдений"""
+        return {'hits': self.hits, 'misses': self.misses, 'unchanged': self.unchanged}
@@ -0,0 +1,134 @@
+# Проверка загрузки погоды через endpoint group на локальной заглушке OpenWeather (без сети и API ключа)
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Число городов в проверке: 45 ID - три запроса group (20 + 20 + 5)
+CHECK_CITY_COUNT = 45
+# Время наблюдения в ответах заглушки: 2024-01-03 10:00 UTC, смещение города +3 часа
+STUB_DT = 1704276000
+STUB_TIMEZONE = 3 * 3600
+
+# Запросы, которые получила заглушка: список ID городов каждого запроса group
+stub_requests = []
+stub_requests_lock = threading.Lock()
+
+
+def stub_city(city_id):
+    """Ответ заглушки для одного города (элемент list ответа group)"""
+    return {
+        'id': city_id,
+        'name': f"Город {city_id}",
+        'dt': STUB_DT,
+        'sys': {'timezone': STUB_TIMEZONE},
+        'main': {'temp': city_id % 30 - 5, 'pressure': 1013, 'humidity': 50 + city_id % 40},
+        'wind': {'speed': 3.5, 'deg': 90},
+        'weather': [{'id': 500, 'description': 'небольшой дождь'}],
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Заглушка OpenWeather: отвечает только на /group?id=..."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path != '/group' or 'id' not in query:
+            self.send_error(404)
+            return
+        city_ids = [int(city_id) for city_id in query['id'][0].split(',')]
+        with stub_requests_lock:
+            stub_requests.append(city_ids)
+        body = json.dumps({'cnt': len(city_ids), 'list': [stub_city(city_id) for city_id in city_ids]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def expected_record(city_id):
+    """Ожидаемая нормализованная запись для города заглушки"""
+    return {
+        'temperature': city_id % 30 - 5,
+        'pressure': 760,  # 1013 гПа в мм рт.ст.
+        'humidity': 50 + city_id % 40,
+        'wind_speed': 3.5,
+        'wind_direction': 'восточный',
+        'description': 'небольшой дождь',
+        'precipitation': 'дождь',
+        'observation_time': datetime(2024, 1, 3, 13, 0),  # Местное время города
+        'city': f"Город {city_id}",
+        'unchanged': False,
+    }
+
+
+def main():
+    """Основная функция. Код возврата 1 - число запросов или записи погоды не совпадают с ожидаемыми"""
+    arg_parser = argparse.ArgumentParser(description="Проверка загрузки погоды через group на локальной заглушке")
+    arg_parser.add_argument('--verbose', action='store_true', help="показать вывод WeatherAPI")
+    args = arg_parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Настройки читаются при импорте weather_api, поэтому задаются до него
+    os.environ['OPENWEATHER_BASE_URL'] = f"http://127.0.0.1:{server.server_port}"
+    os.environ['OPENWEATHER_API_KEY'] = 'check'
+    os.environ['WEATHER_CACHE_TTL'] = '0'
+    from weather_api import GROUP_MAX_IDS, WeatherAPI
+
+    city_ids = list(range(1, CHECK_CITY_COUNT + 1))
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+            records = WeatherAPI().get_data_weather_group(datetime.now(), city_ids)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    success = True
+    expected_calls = -(-len(city_ids) // GROUP_MAX_IDS)
+    requested = sorted(city_id for request in stub_requests for city_id in request)
+    if len(stub_requests) != expected_calls:
+        print(f"✗ Запросов group: {len(stub_requests)}, ожидалось {expected_calls}")
+        success = False
+    elif any(len(request) > GROUP_MAX_IDS for request in stub_requests):
+        print(f"✗ В запросе больше {GROUP_MAX_IDS} городов: {[len(request) for request in stub_requests]}")
+        success = False
+    elif requested != city_ids:
+        print("✗ Запросы group не покрывают список городов ровно один раз")
+        success = False
+    else:
+        print(f"✓ {len(city_ids)} городов загружены за {len(stub_requests)} запроса group "
+              f"({', '.join(str(len(request)) for request in stub_requests)})")
+
+    by_city = {record['city']: record for record in records}
+    mismatched = [city_id for city_id in city_ids if by_city.get(f"Город {city_id}") != expected_record(city_id)]
+    if len(records) != len(city_ids):
+        print(f"✗ Записей погоды: {len(records)}, ожидалось {len(city_ids)}")
+        success = False
+    elif mismatched:
+        city_id = mismatched[0]
+        print(f"✗ Город {city_id}: {by_city.get(f'Город {city_id}')}, ожидалось {expected_record(city_id)}")
+        success = False
+    else:
+        print(f"✓ Записи погоды совпадают с ожидаемыми ({len(records)})")
+
+    if not success and not args.verbose:
+        print(output.getvalue()[-2000:])
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)